@@ -1,34 +1,44 @@
 from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
-import asyncio
-from playwright.async_api import async_playwright
 import json
-import csv
-import io
-from datetime import datetime
 import re
 import os
+import hashlib
+from async_runtime import runtime
+from browser_pool import BrowserPool
+from waits import waits
+from query_cache import QueryCache, normalize_query
+from resource_policy import policies
+from maps_cards import card_to_lead, needs_detail_panel, parse_fields
+from feed_scroller import FeedScroller
+from maps_payload import PayloadHarvester, parse_engine, place_to_lead
+from lead_dedupe import LeadDeduper
+from geo_tiling import place_reference
+from lead_export import EXPORT_FORMATS, export_filename, iter_export
 
 app = Flask(__name__)
 CORS(app)
 
 class LeadScraper:
-    def __init__(self):
+    def __init__(self, browser_pool):
         self.leads = []
+        self.browser_pool = browser_pool
     
-    async def scrape_google_maps_fast(self, location, work_type, max_results=20):
-        """Fast scraping optimized for Vercel timeout limits"""
+    async def scrape_google_maps_fast(self, location, work_type, max_results=20, fields=None, engine=None):
+        """Fast scraping optimized for Vercel timeout limits.
+
+        If only result-card fields are requested, the cards are read in one pass without clicking.
+        With engine='network' the leads are parsed from the search payloads instead.
+        """
         leads = []
+        list_mode = not needs_detail_panel(fields)
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
+        async with self.browser_pool.context(policy='maps') as context:
             page = await context.new_page()
+            harvester = None
+            if parse_engine(engine) == 'network':
+                harvester = PayloadHarvester(page)
+                harvester.attach()
             
             try:
                 import urllib.parse
@@ -39,26 +49,31 @@ class LeadScraper:
                 
                 print(f"🔍 Searching: {search_query}")
                 await page.goto(maps_url, wait_until='domcontentloaded', timeout=30000)
-                await page.wait_for_timeout(3000)
+                await waits.results_loaded(page)
                 
-                # Quick scroll - limit to 5 scrolls for speed
-                for scroll_num in range(5):
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await page.wait_for_timeout(1000)
-                    
-                    # Check if we have enough elements
-                    current_elements = await page.query_selector_all('a[href*="/maps/place/"], div[role="article"]')
-                    if len(current_elements) >= max_results * 2:
-                        break
+                # Quick scroll of the results feed - limit to 5 scrolls for speed
+                scroller = FeedScroller(page, max_scrolls=5, wait_ms=2000)
+                if harvester is not None:
+                    await harvester.harvest_initial_state()
+                await scroller.scroll(target=max_results if list_mode or harvester else max_results * 2)
+                
+                if harvester is not None:
+                    await harvester.drain()
+                    if harvester.places:
+                        print(f"🛰️ Network engine: {harvester.stats()}")
+                        return [place_to_lead(place, location, work_type) for place in harvester.places[:max_results]]
+                    print("⚠️ No places in the Maps payloads - falling back to the page")
+                
+                if list_mode:
+                    return [card_to_lead(card, location, work_type) for card in scroller.cards[:max_results]]
                 
                 # Extract business listings
                 business_elements = await page.query_selector_all('a[href*="/maps/place/"], div[role="article"]')
                 
                 if not business_elements:
-                    await browser.close()
                     return leads
                 
-                processed_names = set()
+                seen = LeadDeduper()
                 max_to_check = min(len(business_elements), max_results * 2)
                 
                 print(f"📊 Processing {max_to_check} businesses...")
@@ -69,17 +84,17 @@ class LeadScraper:
                     
                     try:
                         await element.scroll_into_view_if_needed()
-                        await page.wait_for_timeout(500)
+                        previous_title = await waits.current_title(page)
                         
                         try:
                             await element.click(timeout=5000)
-                        except:
+                        except Exception:
                             try:
                                 await page.evaluate("(element) => element.click()", element)
-                            except:
+                            except Exception:
                                 continue
                         
-                        await page.wait_for_timeout(1500)
+                        await waits.title_changed(page, previous_title)
                         
                         # Extract business information
                         business_data = await page.evaluate("""
@@ -136,11 +151,11 @@ class LeadScraper:
                                 
                                 return data;
                             }
-                        """, timeout=5000)
+                        """)
                         
                         business_name = business_data.get('name', '').strip()
                         
-                        if business_name and business_name not in processed_names:
+                        if business_name and seen.add(business_data):
                             lead = {
                                 'name': business_name,
                                 'address': business_data.get('address', ''),
@@ -149,32 +164,54 @@ class LeadScraper:
                                 'website': business_data.get('website', ''),
                                 'rating': business_data.get('rating', ''),
                                 'category': business_data.get('category', ''),
+                                **place_reference(page.url),
                                 'location': location,
                                 'work_type': work_type
                             }
                             
                             leads.append(lead)
-                            processed_names.add(business_name)
                             
                             await page.keyboard.press('Escape')
-                            await page.wait_for_timeout(500)
+                            await waits.panel_closed(page)
                         
                     except Exception as e:
                         print(f"Error processing business {i}: {str(e)}")
                         try:
                             await page.keyboard.press('Escape')
-                        except:
+                        except Exception:
                             pass
                         continue
                 
             except Exception as e:
                 print(f"Error in scraping: {str(e)}")
-            finally:
-                await browser.close()
         
         return leads
 
-scraper = LeadScraper()
+# Shared Chromium pool - warm instances reuse it across invocations
+browser_pool = BrowserPool(size=1)
+browser_pool.start_in_background()
+
+scraper = LeadScraper(browser_pool)
+query_cache = QueryCache()
+
+def cached_response(payload, entry, state):
+    """JSON response with ETag/Cache-Control so repeat queries are answered without Playwright"""
+    # Hashed without the 'cached' flag, so a miss and the later hits for the same leads share an ETag
+    content = {key: value for key, value in payload.items() if key != 'cached'}
+    etag = '"' + hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()[:20] + '"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.headers['ETag'] = etag
+    if entry.get('stored', True):
+        max_age = query_cache.remaining_ttl(entry)
+        response.headers['Cache-Control'] = f'public, max-age={max_age}, s-maxage={max_age}, stale-while-revalidate={query_cache.stale_ttl}'
+    else:
+        # An empty or failed scrape - the CDN must not serve it to the next visitor
+        response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Cache'] = state.upper()
+    return response
 
 @app.route('/')
 def index():
@@ -188,75 +225,82 @@ def favicon():
     </svg>'''
     return Response(favicon_svg, mimetype='image/svg+xml')
 
-@app.route('/api/scrape', methods=['POST'])
+@app.route('/api/scrape', methods=['GET', 'POST'])
 def scrape_leads():
-    """Synchronous scraping for Vercel - returns results directly"""
+    """Synchronous scraping for Vercel - returns results directly.
+
+    GET with query parameters is also accepted so the edge cache can serve repeat searches.
+    """
     try:
-        data = request.json
+        data = request.json if request.method == 'POST' else request.args
         location = data.get('location', '')
         work_type = data.get('work_type', '')
-        max_results = min(data.get('max_results', 20), 20)  # Limit to 20 for Vercel timeout
+        max_results = min(int(data.get('max_results', 20)), 20)  # Limit to 20 for Vercel timeout
+        # Only card fields (name, rating, reviews, category, address, place_url) = fast list mode
+        fields = parse_fields(data.get('fields'))
+        # 'network' parses the Maps search payloads instead of clicking each result (default: MAPS_ENGINE)
+        engine = parse_engine(data.get('engine'))
         
         if not location or not work_type:
             return jsonify({'error': 'Location and work type are required'}), 400
         
-        # Run scraping synchronously
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        mode = 'maps' if needs_detail_panel(fields) else 'maps_list'
         
-        try:
-            leads = loop.run_until_complete(
-                scraper.scrape_google_maps_fast(location, work_type, max_results)
-            )
-        finally:
-            loop.close()
+        # Serve repeat searches from the query cache; run scraping on the shared browser pool otherwise
+        entry, state = query_cache.get_or_compute(
+            normalize_query(location, work_type, mode if engine == 'dom' else f'{mode}_{engine}'),
+            max_results,
+            lambda: runtime.run(scraper.scrape_google_maps_fast(location, work_type, max_results, fields, engine))
+        )
+        leads = entry['value'][:max_results]
         
-        return jsonify({
+        return cached_response({
             'success': True,
             'leads': leads,
             'count': len(leads),
-            'message': f'Found {len(leads)} leads'
-        })
+            'message': f'Found {len(leads)} leads',
+            'cached': state != 'miss'
+        }, entry, state)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/scrape-icp', methods=['POST'])
+@app.route('/api/scrape-icp', methods=['GET', 'POST'])
 def scrape_icp_leads():
     """ICP Mode - simplified for Vercel"""
     try:
-        data = request.json
+        data = request.json if request.method == 'POST' else request.args
         location = data.get('location', '')
         work_type = data.get('work_type', '')
-        max_results = min(data.get('max_results', 15), 15)  # Limit for timeout
+        max_results = min(int(data.get('max_results', 15)), 15)  # Limit for timeout
         
         if not location or not work_type:
             return jsonify({'error': 'Location and work type are required'}), 400
         
-        # Use same fast scraping but filter for businesses without websites
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            all_leads = loop.run_until_complete(
+        def find_leads_without_websites():
+            # Use same fast scraping but filter for businesses without websites
+            all_leads = runtime.run(
                 scraper.scrape_google_maps_fast(location, work_type, max_results * 2)
             )
-            
-            # Filter for businesses without websites
-            leads_without_websites = [
+            return [
                 lead for lead in all_leads 
                 if not lead.get('website') or lead.get('website') == ''
             ][:max_results]
-            
-        finally:
-            loop.close()
         
-        return jsonify({
+        entry, state = query_cache.get_or_compute(
+            normalize_query(location, work_type, 'icp'),
+            max_results,
+            find_leads_without_websites
+        )
+        leads_without_websites = entry['value'][:max_results]
+        
+        return cached_response({
             'success': True,
             'leads': leads_without_websites,
             'count': len(leads_without_websites),
-            'mode': 'ICP - Businesses Without Websites'
-        })
+            'mode': 'ICP - Businesses Without Websites',
+            'cached': state != 'miss'
+        }, entry, state)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -269,53 +313,61 @@ def scrape_influencers():
         'message': 'Please use Railway deployment for influencer scraping'
     }), 501
 
+@app.route('/api/cache', methods=['GET'])
+def cache_status():
+    """Query cache size and hit counters"""
+    return jsonify(query_cache.stats())
+
+@app.route('/api/cache', methods=['DELETE'])
+def invalidate_cache():
+    """Invalidate one query ({location, work_type, mode}) or the whole query cache"""
+    data = request.get_json(silent=True) or {}
+    if data.get('location') and data.get('work_type'):
+        removed = query_cache.invalidate(normalize_query(data['location'], data['work_type'], data.get('mode', 'maps')))
+    else:
+        removed = query_cache.invalidate()
+    return jsonify({'success': True, 'removed': removed})
+
+@app.route('/api/pool-status', methods=['GET'])
+def pool_status():
+    """Browser pool occupancy"""
+    return jsonify(browser_pool.stats())
+
+@app.route('/api/resource-stats', methods=['GET'])
+def resource_stats():
+    """Requests blocked per scraper policy and the estimated bandwidth saved"""
+    return jsonify(policies.stats())
+
+@app.route('/api/wait-stats', methods=['GET'])
+def wait_stats():
+    """How long each kind of page wait actually took"""
+    return jsonify(waits.stats())
+
+def export_response(leads, fmt):
+    """Streamed file download; rows are serialized as they are sent, the header is every lead's keys"""
+    return Response(
+        iter_export(leads, fmt),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{export_filename("leads", fmt)}"'}
+    )
+
 @app.route('/api/export/csv', methods=['POST'])
 def export_csv():
     try:
-        data = request.json
-        leads = data.get('leads', [])
-        
+        leads = (request.json or {}).get('leads', [])
         if not leads:
             return jsonify({'error': 'No leads to export'}), 400
-        
-        output = io.StringIO()
-        if leads:
-            fieldnames = leads[0].keys()
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(leads)
-        
-        output.seek(0)
-        filename = f"leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        return export_response(leads, 'csv')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/export/json', methods=['POST'])
 def export_json():
     try:
-        data = request.json
-        leads = data.get('leads', [])
-        
+        leads = (request.json or {}).get('leads', [])
         if not leads:
             return jsonify({'error': 'No leads to export'}), 400
-        
-        filename = f"leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        return send_file(
-            io.BytesIO(json.dumps(leads, indent=2).encode('utf-8')),
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        return export_response(leads, 'json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
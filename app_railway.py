@@ -1,56 +1,175 @@
 from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
 import asyncio
-from playwright.async_api import async_playwright
 import json
-import csv
-import io
 from datetime import datetime
-import re
-import threading
 import queue
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeout
 import os
+import threading
+import time
+import uuid
+from async_runtime import runtime
+from browser_pool import BrowserPool
+from waits import waits
+from email_extractor import EmailExtractor
+from email_cache import EmailCache, email_key
+from query_cache import QueryCache, normalize_query
+from resource_policy import policies
+from session_store import SessionManager
+from lead_store import LeadStore
+from job_scheduler import JobScheduler, QueueFull
+from maps_cards import card_to_lead, detail_level, needs_detail_panel, parse_fields
+from feed_scroller import FeedScroller
+from maps_payload import PayloadHarvester, parse_engine, place_to_lead
+from source_fanout import LeadFanOut, SCRAPE_SOURCES, source_timeout
+from lead_dedupe import LeadDeduper
+from batch_jobs import BatchRun, parse_max_results, parse_pairs
+from lead_export import EXPORT_FORMATS, export_filename, iter_export
+from columnar_export import COLUMNAR_FORMATS, columnar_file
+from geo_tiling import (TILE_CONCURRENCY, TILE_MAX_RINGS, TILE_MIN_NEW, TILE_REUSE_S, TILE_THRESHOLD, grid_ring,
+                        parse_areas, parse_viewport, place_reference, search_url, tiled_budget)
 
 app = Flask(__name__)
 CORS(app)
 
+# Reads the open place panel (or a /maps/place/ page) into a plain dict
+PLACE_DETAILS_JS = """
+    () => {
+        const data = {};
+
+        // Extract name - try multiple selectors
+        const nameSelectors = [
+            'h1[data-attrid="title"]',
+            'h1.DUwDvf',
+            'h1[class*="DUwDvf"]',
+            'h1',
+            '[data-value="Directions"]',
+            'button[data-value="Directions"]'
+        ];
+
+        for (const selector of nameSelectors) {
+            const el = document.querySelector(selector);
+            if (el && el.textContent && el.textContent.trim()) {
+                data.name = el.textContent.trim();
+                break;
+            }
+        }
+
+        // Extract address
+        const addressSelectors = [
+            'button[data-item-id="address"]',
+            '[data-item-id="address"]',
+            'span.LrzXr',
+            '[data-value*="address"]'
+        ];
+
+        for (const selector of addressSelectors) {
+            const el = document.querySelector(selector);
+            if (el && el.textContent && el.textContent.trim()) {
+                data.address = el.textContent.trim();
+                break;
+            }
+        }
+
+        // Extract phone
+        const phoneSelectors = [
+            'button[data-item-id^="phone"]',
+            '[data-item-id^="phone"]',
+            'span[data-local-attribute="d3ph"]',
+            'a[href^="tel:"]'
+        ];
+
+        for (const selector of phoneSelectors) {
+            const el = document.querySelector(selector);
+            if (el) {
+                data.phone = el.textContent?.trim() || el.href?.replace('tel:', '') || '';
+                if (data.phone) break;
+            }
+        }
+
+        // Extract website
+        const websiteEl = document.querySelector('a[data-item-id="authority"]') ||
+                        document.querySelector('a[href^="http"]:not([href*="google"])');
+        data.website = websiteEl?.href || '';
+
+        // Extract rating
+        const ratingEl = document.querySelector('span.MW4etd') ||
+                       document.querySelector('[aria-label*="stars"]') ||
+                       document.querySelector('[aria-label*="rating"]');
+        data.rating = ratingEl?.textContent?.trim() || ratingEl?.getAttribute('aria-label') || '';
+
+        // Extract category
+        const categoryEl = document.querySelector('button[jsaction*="category"]') ||
+                         document.querySelector('span.DkEaL') ||
+                         document.querySelector('[data-value*="category"]');
+        data.category = categoryEl?.textContent?.trim() || '';
+
+        return data;
+    }
+"""
+
+# Overall budget for one lead's email lookup (HTTP plus any browser fallback)
+EMAIL_TIMEOUT_S = float(os.environ.get('EMAIL_TIMEOUT_S', 8))
+# Longest /api/leads/nearby waits for `near` to be placed on the map
+GEOCODE_TIMEOUT_S = float(os.environ.get('GEOCODE_TIMEOUT_S', 20))
+# Seconds between SSE comment lines that keep idle streams open through proxies
+SSE_HEARTBEAT_S = float(os.environ.get('SSE_HEARTBEAT_S', 15))
+# A job whose last stream consumer went away is cancelled unless a client reconnects within this time
+STREAM_DISCONNECT_GRACE_S = float(os.environ.get('STREAM_DISCONNECT_GRACE_S', 10))
+
 class LeadScraper:
-    def __init__(self):
+    def __init__(self, browser_pool, email_extractor=None, email_cache=None, lead_store=None):
         self.leads = []
+        self.browser_pool = browser_pool
+        self.email_extractor = email_extractor or EmailExtractor(browser_pool)
+        self.email_cache = email_cache or EmailCache()
+        self.lead_store = lead_store
+        self._geocodes = {}
     
-    async def scrape_google_maps(self, location, work_type, max_results=50, progress_queue=None):
-        """Scrape business leads from Google Maps"""
+    async def scrape_google_maps(self, location, work_type, max_results=50, progress_queue=None, concurrency=None,
+                                 fields=None, engine=None, search_query=None, viewport=None):
+        """Scrape business leads from Google Maps.
+
+        With concurrency > 1 the place links are collected from the results feed and
+        opened directly on that many worker pages instead of the click/Escape loop.
+        When every requested field is on the result cards (see maps_cards.CARD_FIELDS)
+        the cards are read in one pass and no detail panel is opened.
+        With engine='network' the leads come from the search payloads the page
+        fetches while the feed scrolls; the DOM path is the fallback if none parse.
+        `search_query` and `viewport` (lat, lng, zoom) pin the search to one tile.
+        """
         leads = []
+        if concurrency is None:
+            concurrency = int(os.environ.get('MAPS_DETAIL_CONCURRENCY', 1))
+        list_mode = not needs_detail_panel(fields)
+        engine = parse_engine(engine)
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
+        async with self.browser_pool.context(policy='maps') as context:
             page = await context.new_page()
+            harvester = None
+            if engine == 'network':
+                # Listen before navigating so the first search responses are not missed
+                harvester = PayloadHarvester(page)
+                harvester.attach()
             
             try:
                 # Search Google Maps - properly format location
-                import urllib.parse
                 location_clean = location.strip()
                 # Ensure location is specific (add city/state if just "Downtown")
                 if location_clean.lower() == 'downtown':
                     # Try to get user's location or use a default
                     location_clean = 'Downtown, USA'  # Will be overridden by actual search
                 
-                search_query = f"{work_type} in {location_clean}"
-                encoded_query = urllib.parse.quote_plus(search_query)
-                maps_url = f"https://www.google.com/maps/search/{encoded_query}"
+                search_query = search_query or f"{work_type} in {location_clean}"
+                maps_url = search_url(search_query, viewport)
                 
                 print(f"🔍 Searching: {search_query}")
                 print(f"📍 URL: {maps_url}")
                 
                 print(f"🌐 Navigating to Google Maps...")
                 await page.goto(maps_url, wait_until='domcontentloaded', timeout=60000)
-                await page.wait_for_timeout(5000)  # Wait longer for page to load
+                await waits.results_loaded(page)
                 
                 # Check if we're on the right page
                 current_url = page.url
@@ -62,35 +181,55 @@ class LeadScraper:
                     accept_buttons = await page.query_selector_all('button:has-text("Accept"), button:has-text("I agree"), button:has-text("Agree")')
                     for btn in accept_buttons[:1]:
                         await btn.click()
-                        await page.wait_for_timeout(1000)
-                except:
+                        await waits.results_loaded(page)
+                except Exception:
                     pass
                 
-                # Scroll to load more results - scroll based on max_results needed
-                scroll_count = min(30, max(20, max_results // 2))  # More scrolls for more results needed
-                print(f"📜 Scrolling {scroll_count} times to load more results...")
+                # Scroll the results feed; the observer hands over cards as they are appended
+                scroller = FeedScroller(page)
+                has_feed = await scroller.start()
+                
+                if harvester is not None:
+                    network_leads = await self.leads_from_payloads(
+                        harvester, scroller, location, work_type, max_results, progress_queue, fields
+                    )
+                    if network_leads:
+                        return network_leads
+                    print("⚠️ No places in the Maps payloads - falling back to the page")
                 
-                for scroll_num in range(scroll_count):
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await page.wait_for_timeout(1500)
+                if list_mode:
+                    # Leads go out as soon as their card shows up, while scrolling continues
+                    def emit_cards(cards):
+                        for card in cards:
+                            if len(leads) >= max_results:
+                                return
+                            lead = card_to_lead(card, location, work_type)
+                            leads.append(lead)
+                            if progress_queue:
+                                progress_queue.put(('lead', lead), timeout=5)
                     
-                    # Try to click "Show more" buttons
+                    emit_cards(scroller.cards)
+                    scroller.on_cards = emit_cards
+                    await scroller.scroll(target=max_results)
+                    print(f"⚡ List mode: {len(leads)} leads from result cards ({scroller.stats()})")
+                    return leads
+                
+                # A scroller that already finished (network fallback) has closed its URL queue
+                if concurrency > 1 and has_feed and not scroller.done.is_set():
+                    # Detail workers start on the first cards while the feed keeps scrolling
+                    print(f"🔗 Extracting place links on {concurrency} pages while scrolling...")
+                    scrolling = asyncio.create_task(scroller.scroll(target=max_results * 5))
                     try:
-                        show_more_buttons = await page.query_selector_all('button[aria-label*="more"], button:has-text("Show more"), button[aria-label*="Show more results"]')
-                        for btn in show_more_buttons[:2]:  # Click up to 2 buttons
-                            try:
-                                await btn.click()
-                                await page.wait_for_timeout(2000)
-                            except:
-                                pass
-                    except:
-                        pass
-                    
-                    # Check if we have enough elements loaded
-                    current_elements = await page.query_selector_all('a[href*="/maps/place/"], div[role="article"]')
-                    if len(current_elements) >= max_results * 3:
-                        print(f"✅ Loaded {len(current_elements)} business elements, enough for {max_results} leads")
-                        break
+                        return await self.extract_places_concurrently(
+                            context, scroller, location, work_type,
+                            max_results, concurrency, progress_queue
+                        )
+                    finally:
+                        scrolling.cancel()
+                        print(f"📜 Feed: {scroller.stats()}")
+                
+                reason = await scroller.scroll(target=max_results * 3)
+                print(f"📜 Loaded {len(scroller.cards)} result cards, stopped: {reason}")
                 
                 # Extract business listings - try multiple selectors
                 business_elements = []
@@ -119,14 +258,12 @@ class LeadScraper:
                             business_elements = all_links[:max_results * 2]
                         else:
                             print("⚠️ Still no business elements found")
-                            await browser.close()
                             return leads
                     except Exception as e:
                         print(f"Error in fallback: {e}")
-                        await browser.close()
                         return leads
                 
-                processed_names = set()  # Track processed business names to avoid duplicates
+                seen = LeadDeduper()  # Same business by phone/address/fuzzy name; chain branches are kept
                 max_to_check = min(len(business_elements), max_results * 5)  # Check 5x to ensure we get enough
                 
                 print(f"📊 Checking {max_to_check} businesses to find {max_results} leads...")
@@ -141,7 +278,7 @@ class LeadScraper:
                         print(f"📋 Processing business {i+1}/{min(max_to_check, len(business_elements))}... (Current: {len(leads)}/{max_results})")
                         # Scroll element into view first
                         await element.scroll_into_view_if_needed()
-                        await page.wait_for_timeout(1000)
+                        previous_title = await waits.current_title(page)
                         
                         # Click on business to get details
                         try:
@@ -151,115 +288,26 @@ class LeadScraper:
                             # Try JavaScript click
                             try:
                                 await page.evaluate("(element) => element.click()", element)
-                            except:
+                            except Exception:
                                 print(f"   ⚠️ JavaScript click also failed, skipping...")
                                 continue
                         
-                        await page.wait_for_timeout(2000)  # Wait for details to load
+                        await waits.title_changed(page, previous_title)  # Wait for details to load
                         
                         # Extract business information with better error handling
                         try:
-                            business_data = await page.evaluate("""
-                                () => {
-                                    const data = {};
-                                    
-                                    // Extract name - try multiple selectors
-                                    const nameSelectors = [
-                                        'h1[data-attrid="title"]',
-                                        'h1.DUwDvf',
-                                        'h1[class*="DUwDvf"]',
-                                        'h1',
-                                        '[data-value="Directions"]',
-                                        'button[data-value="Directions"]'
-                                    ];
-                                    
-                                    for (const selector of nameSelectors) {
-                                        const el = document.querySelector(selector);
-                                        if (el && el.textContent && el.textContent.trim()) {
-                                            data.name = el.textContent.trim();
-                                            break;
-                                        }
-                                    }
-                                    
-                                    // Extract address
-                                    const addressSelectors = [
-                                        'button[data-item-id="address"]',
-                                        '[data-item-id="address"]',
-                                        'span.LrzXr',
-                                        '[data-value*="address"]'
-                                    ];
-                                    
-                                    for (const selector of addressSelectors) {
-                                        const el = document.querySelector(selector);
-                                        if (el && el.textContent && el.textContent.trim()) {
-                                            data.address = el.textContent.trim();
-                                            break;
-                                        }
-                                    }
-                                    
-                                    // Extract phone
-                                    const phoneSelectors = [
-                                        'button[data-item-id^="phone"]',
-                                        '[data-item-id^="phone"]',
-                                        'span[data-local-attribute="d3ph"]',
-                                        'a[href^="tel:"]'
-                                    ];
-                                    
-                                    for (const selector of phoneSelectors) {
-                                        const el = document.querySelector(selector);
-                                        if (el) {
-                                            data.phone = el.textContent?.trim() || el.href?.replace('tel:', '') || '';
-                                            if (data.phone) break;
-                                        }
-                                    }
-                                    
-                                    // Extract website
-                                    const websiteEl = document.querySelector('a[data-item-id="authority"]') ||
-                                                    document.querySelector('a[href^="http"]:not([href*="google"])');
-                                    data.website = websiteEl?.href || '';
-                                    
-                                    // Extract rating
-                                    const ratingEl = document.querySelector('span.MW4etd') ||
-                                                   document.querySelector('[aria-label*="stars"]') ||
-                                                   document.querySelector('[aria-label*="rating"]');
-                                    data.rating = ratingEl?.textContent?.trim() || ratingEl?.getAttribute('aria-label') || '';
-                                    
-                                    // Extract category
-                                    const categoryEl = document.querySelector('button[jsaction*="category"]') ||
-                                                     document.querySelector('span.DkEaL') ||
-                                                     document.querySelector('[data-value*="category"]');
-                                    data.category = categoryEl?.textContent?.trim() || '';
-                                    
-                                    return data;
-                                }
-                            """, timeout=10000)
+                            business_data = await asyncio.wait_for(page.evaluate(PLACE_DETAILS_JS), 10)
                         except Exception as eval_error:
                             print(f"   ⚠️ Error extracting data: {eval_error}")
                             business_data = {}
                         
                         business_name = business_data.get('name', '').strip()
                         
-                        # Only process if we have a name and haven't seen it before
-                        if business_name and business_name not in processed_names:
-                            # Validate that we have at least name or address
-                            if not business_name:
-                                print(f"   ⚠️ Skipping: No name found")
-                                await page.keyboard.press('Escape')
-                                await page.wait_for_timeout(500)
-                                continue
-                            
+                        # Only process if we have a name and haven't seen the business before
+                        is_new = bool(business_name) and seen.add(business_data)
+                        if is_new:
                             # Try to extract email from website if available (but don't wait too long)
-                            email = ''
-                            if business_data.get('website'):
-                                try:
-                                    email = await asyncio.wait_for(
-                                        self.extract_email_from_website(business_data['website'], page),
-                                        timeout=5.0
-                                    )
-                                except asyncio.TimeoutError:
-                                    print(f"   ⏱️ Email extraction timed out, continuing...")
-                                except Exception as email_error:
-                                    print(f"   ⚠️ Email extraction error: {email_error}")
+                            email = await self._email_for_website(business_data.get('website'), page)
                             
                             lead = {
                                 'name': business_name,
@@ -269,12 +317,12 @@ class LeadScraper:
                                 'website': business_data.get('website', ''),
                                 'rating': business_data.get('rating', ''),
                                 'category': business_data.get('category', ''),
+                                **place_reference(page.url),
                                 'location': location,
                                 'work_type': work_type
                             }
                             
                             leads.append(lead)
-                            processed_names.add(business_name)
                             
                             # Send lead update in real-time if queue available
                             if progress_queue:
@@ -290,19 +338,18 @@ class LeadScraper:
                             if len(leads) >= max_results:
                                 print(f"🎯 Target reached! Found {len(leads)} leads")
                                 await page.keyboard.press('Escape')
-                                await page.wait_for_timeout(500)
                                 break
                             
                             # Go back to results
                             await page.keyboard.press('Escape')
-                            await page.wait_for_timeout(1000)
+                            await waits.panel_closed(page)
                         else:
-                            if business_name in processed_names:
+                            if business_name:
                                 print(f"   ⏭️ Skipping duplicate: {business_name[:30]}...")
                             else:
                                 print(f"   ⚠️ Skipping: Invalid data")
                             await page.keyboard.press('Escape')
-                            await page.wait_for_timeout(500)
+                            await waits.panel_closed(page)
                             
                     except Exception as e:
                         print(f"Error processing business {i}: {str(e)}")
@@ -310,53 +357,295 @@ class LeadScraper:
                 
             except Exception as e:
                 print(f"Error in scraping: {str(e)}")
+        
+        return leads
+    
+    async def leads_from_payloads(self, harvester, scroller, location, work_type, max_results,
+                                  progress_queue=None, fields=None):
+        """Leads from the places a PayloadHarvester parses while the feed scrolls - no clicks, no detail panels"""
+        started = time.perf_counter()
+        leads = []
+        want_email = fields is None or 'email' in fields
+        arrived = asyncio.Event()
+        harvester.on_places = lambda places: arrived.set()
+        await harvester.harvest_initial_state()
+        scrolling = asyncio.create_task(scroller.scroll(target=max_results))
+        index = 0
+        try:
+            while len(leads) < max_results:
+                arrived.clear()
+                if index < len(harvester.places):
+                    place = harvester.places[index]
+                    index += 1
+                    email = await self._email_for_website(place['website'], None) if want_email else ''
+                    lead = place_to_lead(place, location, work_type, email)
+                    leads.append(lead)
+                    if progress_queue:
+                        try:
+                            progress_queue.put(('lead', lead), timeout=5)
+                        except Exception as queue_error:
+                            print(f"⚠️ Queue error: {queue_error}")
+                    continue
+                if scrolling.done():
+                    # Bodies still being read after the last scroll
+                    await harvester.drain()
+                    if index >= len(harvester.places):
+                        break
+                    continue
+                try:
+                    await asyncio.wait_for(arrived.wait(), 1)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if leads:
+                scroller.stop()
+            if not scrolling.done():
+                scrolling.cancel()
+        print(f"🛰️ Network engine: {len(leads)} leads in {time.perf_counter() - started:.1f}s "
+              f"(payloads: {harvester.stats()}, feed: {scroller.stats()})")
+        return leads
+    
+    async def extract_places_concurrently(self, context, place_urls, location, work_type, max_results,
+                                          concurrency, progress_queue=None):
+        """Open /maps/place/ URLs on a bounded set of worker pages; leads stream out in completion order.
+
+        `place_urls` is a list, or a FeedScroller that is still delivering URLs while it scrolls.
+        """
+        leads = []
+        seen = LeadDeduper()
+        if isinstance(place_urls, FeedScroller):
+            source = place_urls
+            worker_count = max(1, concurrency)
+        else:
+            if not place_urls:
+                return leads
+            source = FeedScroller(None)
+            for url in place_urls:
+                source.urls.put_nowait(url)
+            source.stop()
+            worker_count = max(1, min(concurrency, len(place_urls)))
+        
+        async def worker(worker_id):
+            page = await context.new_page()
+            try:
+                while len(leads) < max_results:
+                    url = await source.next_url()
+                    if url is None:
+                        return
+                    
+                    try:
+                        await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                        if '/sorry/' in page.url:
+                            # Google is rate limiting us - retire this worker so effective N shrinks
+                            print(f"   🛑 Worker {worker_id} hit a rate-limit page, stopping")
+                            return
+                        await waits.title_changed(page, '', timeout=10000)
+                        business_data = await asyncio.wait_for(page.evaluate(PLACE_DETAILS_JS), 10)
+                    except Exception as e:
+                        print(f"   ⚠️ Worker {worker_id} failed on {url[:60]}: {e}")
+                        continue
+                    
+                    business_name = business_data.get('name', '').strip()
+                    if not business_name or not seen.add(business_data):
+                        continue
+                    
+                    email = await self._email_for_website(business_data.get('website'), page)
+                    if len(leads) >= max_results:
+                        return
+                    
+                    lead = {
+                        'name': business_name,
+                        'address': business_data.get('address', ''),
+                        'phone': business_data.get('phone', ''),
+                        'email': email,
+                        'website': business_data.get('website', ''),
+                        'rating': business_data.get('rating', ''),
+                        'category': business_data.get('category', ''),
+                        **place_reference(page.url),
+                        'location': location,
+                        'work_type': work_type
+                    }
+                    leads.append(lead)
+                    
+                    if progress_queue:
+                        try:
+                            progress_queue.put(('lead', lead), timeout=5)
+                        except Exception as queue_error:
+                            print(f"⚠️ Queue error: {queue_error}")
+                    
+                    print(f"✅ Found lead {len(leads)}/{max_results} (worker {worker_id}): {lead['name'][:30]}...")
+                    if len(leads) >= max_results:
+                        # Enough leads - stop scrolling and release workers waiting for URLs
+                        source.stop()
             finally:
-                await browser.close()
+                try:
+                    await page.close()
+                except Exception:
+                    pass
         
+        await asyncio.gather(*(worker(i) for i in range(worker_count)))
         return leads
     
-    async def extract_email_from_website(self, website_url, page):
-        """Try to extract email from business website"""
+    async def _email_for_website(self, website_url, page):
+        """Email lookup with a short timeout so it never stalls the Maps loop"""
+        if not website_url:
+            return ''
         try:
-            if not website_url or not website_url.startswith('http'):
-                return ''
-            
-            # Open website in new tab
-            new_page = await page.context.new_page()
-            await new_page.goto(website_url, wait_until='networkidle', timeout=10000)
-            await new_page.wait_for_timeout(2000)
-            
-            # Extract email using regex
-            page_content = await new_page.content()
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            emails = re.findall(email_pattern, page_content)
-            
-            # Filter out common non-business emails
-            filtered_emails = [e for e in emails if not any(x in e.lower() for x in ['example.com', 'test.com', 'placeholder'])]
-            
-            await new_page.close()
-            
-            return filtered_emails[0] if filtered_emails else ''
-        except:
+            return await asyncio.wait_for(
+                self.extract_email_from_website(website_url, page),
+                timeout=EMAIL_TIMEOUT_S
+            )
+        except asyncio.TimeoutError:
+            print(f"   ⏱️ Email extraction timed out, continuing...")
+        except Exception as email_error:
+            print(f"   ⚠️ Email extraction error: {email_error}")
+        return ''
+    
+    async def extract_email_from_website(self, website_url, page=None):
+        """Try to extract email from business website (pooled HTTP first, browser only for JS-rendered sites)"""
+        key = email_key(website_url)
+        # SQLite calls go to a worker thread so a busy cache file never stalls the event loop
+        cached = await asyncio.to_thread(self.email_cache.get, key) if key else None
+        if cached is not None:
+            return cached
+        try:
+            email = await self.email_extractor.extract(website_url, page)
+        except Exception:
             return ''
+        # None means the site could not be read - don't cache that as "no email"
+        if email is not None and key:
+            await asyncio.to_thread(self.email_cache.set, key, email)
+        return email or ''
+    
+    async def scrape_all_sources(self, location, work_type, max_results=50, progress_queue=None, concurrency=None,
+                                 fields=None, engine=None, sources=None, areas=None):
+        """Run the configured sources (SCRAPE_SOURCES) at the same time and merge their leads as they arrive"""
+        factories = {
+            'maps': lambda sink: self.scrape_maps_tiled(
+                location, work_type, max_results, sink, concurrency, fields, engine, areas
+            ),
+            'yellow_pages': lambda sink: self.scrape_yellow_pages(location, work_type, max_results, sink)
+        }
+        timeouts = {}
+        if max_results > TILE_THRESHOLD or areas:
+            # Each tile already has the Maps budget; the tiled run as a whole gets one per wave of tiles
+            timeouts['maps'] = tiled_budget(source_timeout('maps'), areas)
+        fanout = LeadFanOut(max_results, progress_queue, timeouts=timeouts)
+        return await fanout.run({name: factories[name] for name in (sources or SCRAPE_SOURCES) if name in factories})
+    
+    async def scrape_maps_tiled(self, location, work_type, max_results=50, progress_queue=None, concurrency=None,
+                                fields=None, engine=None, areas=None):
+        """Google Maps split into tiles, for more results than one search returns.
+
+        Small requests are a single search. Otherwise the tiles are the given
+        `areas` (neighbourhoods, ZIP codes), or square rings of viewports around
+        the location's center, expanded ring by ring. Tiles run concurrently
+        (MAPS_TILE_CONCURRENCY), share one deduper, and expansion stops at
+        `max_results` or when a ring averages fewer than MAPS_TILE_MIN_NEW new places.
+        Grid tiles scraped for this work type, at the same detail level and with
+        the same engine, within MAPS_TILE_REUSE_S are answered from the lead
+        store instead of the browser.
+        """
+        if max_results <= TILE_THRESHOLD and not areas:
+            return await self.scrape_google_maps(location, work_type, max_results, progress_queue, concurrency, fields,
+                                                 engine)
+        
+        reused = []
+        # Card-only tiles lack detail panel fields and engines differ in what they read, so both key the reuse
+        detail = detail_level(fields)
+        tile_engine = parse_engine(engine)
+        
+        def tile(query, viewport=None):
+            if viewport and self.lead_store and TILE_REUSE_S and self.lead_store.recent_tile(
+                    work_type, *viewport, TILE_REUSE_S, detail=detail, engine=tile_engine):
+                reused.append(viewport)
+                
+                async def stored(sink):
+                    return self.lead_store.leads_in_tile(work_type, *viewport, limit=max_results)
+                return stored
+            
+            async def scrape(sink):
+                found = await self.scrape_google_maps(
+                    location, work_type, max_results, sink, concurrency, fields, engine, query, viewport
+                )
+                # Stopped tiles raise; empty ones may have failed, so they are tried again next time
+                if viewport and self.lead_store and found:
+                    # Including the leads the job itself dropped as duplicates, so a reuse gets the whole tile
+                    for lead in found:
+                        self.lead_store.record_lead(lead)
+                    self.lead_store.record_tile(work_type, *viewport, leads=len(found), detail=detail,
+                                                engine=tile_engine)
+                return found
+            return scrape
+        
+        deduper = LeadDeduper()
+        leads = []
+        
+        async def run_tiles(factories):
+            fanout = LeadFanOut(max_results - len(leads), progress_queue, deduper,
+                                timeout=source_timeout('maps'), concurrency=TILE_CONCURRENCY)
+            found = await fanout.run(factories)
+            leads.extend(found)
+            return found
+        
+        if areas:
+            print(f"🧩 Tiling by {len(areas)} areas")
+            await run_tiles({area: tile(f"{work_type} in {area}") for area in areas})
+            return leads
+        
+        center = await self.geocode(location)
+        if center is None:
+            print(f"⚠️ Could not place {location} on the map - running a single search")
+            return await self.scrape_google_maps(location, work_type, max_results, progress_queue, concurrency, fields,
+                                                 engine)
+        
+        for ring in range(TILE_MAX_RINGS + 1):
+            tiles = grid_ring(center[0], center[1], ring)
+            print(f"🧩 Ring {ring}: {len(tiles)} tiles around {center[:2]} ({len(leads)}/{max_results} leads so far)")
+            reused.clear()
+            factories = {f'tile {lat},{lng}': tile(work_type, (lat, lng, zoom)) for lat, lng, zoom in tiles}
+            if reused:
+                print(f"🗄️ {len(reused)}/{len(tiles)} tiles of ring {ring} were scraped recently - using stored leads")
+            found = await run_tiles(factories)
+            if len(leads) >= max_results:
+                break
+            if len(found) < TILE_MIN_NEW * len(tiles):
+                print(f"🧩 Ring {ring} added only {len(found)} new places - not expanding further")
+                break
+        return leads
     
-    async def scrape_yellow_pages(self, location, work_type, max_results=30):
+    async def geocode(self, location):
+        """(lat, lng, zoom) Google Maps centers on for a location, or None; cached per location"""
+        key = ' '.join(location.split()).casefold()
+        if key in self._geocodes:
+            return self._geocodes[key]
+        center = None
+        async with self.browser_pool.context(policy='maps') as context:
+            page = await context.new_page()
+            try:
+                await page.goto(search_url(location), wait_until='domcontentloaded', timeout=30000)
+                # Maps rewrites the URL to "/@lat,lng,zoomz" once the map has moved to the place
+                await page.wait_for_function("() => location.href.includes('/@')", timeout=15000)
+                center = parse_viewport(page.url)
+            except Exception as e:
+                print(f"⚠️ Geocoding {location} failed: {e}")
+        if center is not None:
+            self._geocodes[key] = center
+        return center
+    
+    async def scrape_yellow_pages(self, location, work_type, max_results=30, progress_queue=None):
         """Alternative: Scrape from Yellow Pages"""
         leads = []
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            page = await browser.new_page()
+        async with self.browser_pool.context(policy='yellow_pages') as context:
+            page = await context.new_page()
             
             try:
                 search_query = f"{work_type} {location}"
                 url = f"https://www.yellowpages.com/search?search_terms={search_query.replace(' ', '+')}&geo_location_terms={location.replace(' ', '+')}"
                 
                 await page.goto(url, wait_until='networkidle')
-                await page.wait_for_timeout(3000)
+                await waits.selector(page, '.result', timeout=5000, state='attached')
                 
                 # Extract business listings
                 listings = await page.query_selector_all('.result')
@@ -376,7 +665,7 @@ class LeadScraper:
                         """)
                         
                         if data.get('name'):
-                            leads.append({
+                            lead = {
                                 'name': data.get('name', ''),
                                 'address': data.get('address', ''),
                                 'phone': data.get('phone', ''),
@@ -386,14 +675,15 @@ class LeadScraper:
                                 'category': data.get('category', ''),
                                 'location': location,
                                 'work_type': work_type
-                            })
-                    except:
+                            }
+                            leads.append(lead)
+                            if progress_queue:
+                                progress_queue.put(('lead', lead), timeout=5)
+                    except Exception:
                         continue
                         
             except Exception as e:
                 print(f"Yellow Pages error: {str(e)}")
-            finally:
-                await browser.close()
         
         return leads
     
@@ -404,14 +694,7 @@ class LeadScraper:
         businesses_with_websites = 0
         debug_info = []
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-            )
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
+        async with self.browser_pool.context(policy='maps') as context:
             page = await context.new_page()
             
             try:
@@ -421,13 +704,12 @@ class LeadScraper:
                 
                 print(f"Searching: {search_query}")
                 await page.goto(maps_url, wait_until='networkidle', timeout=60000)
-                await page.wait_for_timeout(3000)
+                await waits.results_loaded(page)
                 
-                # Scroll more to get more results
-                for scroll_num in range(5):
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await page.wait_for_timeout(2000)
-                    print(f"Scrolled {scroll_num + 1}/5")
+                # Scroll the results feed until there are enough businesses to check
+                scroller = FeedScroller(page)
+                reason = await scroller.scroll(target=max_results * 5)
+                print(f"📜 Loaded {len(scroller.cards)} result cards, stopped: {reason}")
                 
                 # Try multiple selectors to find business listings
                 business_elements = []
@@ -464,7 +746,7 @@ class LeadScraper:
                         }
                     }
                 
-                processed_names = set()
+                seen = LeadDeduper()
                 # Check MORE businesses - don't limit too early, keep going until we find enough
                 max_to_check = min(len(business_elements), max_results * 5)  # Check 5x more to find ones without websites
                 
@@ -480,14 +762,16 @@ class LeadScraper:
                             print(f"Found {len(all_leads)} leads, stopping as requested.")
                             break
                         
+                        previous_title = await waits.current_title(page)
+                        
                         # Click on business to get details
                         try:
                             await element.click()
-                        except:
+                        except Exception:
                             # Try alternative click method
                             await element.evaluate('el => el.click()')
                         
-                        await page.wait_for_timeout(2500)  # Wait for details to load
+                        await waits.title_changed(page, previous_title)  # Wait for details to load
                         
                         # Extract business information with improved selectors
                         business_data = await page.evaluate("""
@@ -642,7 +926,7 @@ class LeadScraper:
                                 debug_info.append(f"✓ {business_name[:30]}... - HAS website in Google Maps listing")
                             else:
                                 # This business has NOT added their website to Google Maps - PERFECT LEAD!
-                                if business_name not in processed_names:
+                                if seen.add(business_data):
                                     lead = {
                                         'name': business_name,
                                         'address': business_data.get('address', ''),
@@ -651,6 +935,7 @@ class LeadScraper:
                                         'website': 'Not Listed in Google Maps',  # More accurate description
                                         'rating': business_data.get('rating', ''),
                                         'category': business_data.get('category', ''),
+                                        **place_reference(page.url),
                                         'location': location,
                                         'work_type': work_type,
                                         'has_website': False,
@@ -659,15 +944,16 @@ class LeadScraper:
                                     }
                                     
                                     all_leads.append(lead)
-                                    processed_names.add(business_name)
                                     debug_info.append(f"★ {business_name[:30]}... - NO website in Google Maps (PERFECT LEAD!)")
+                                    if progress_queue:
+                                        progress_queue.put(('lead', lead))
                         
                         # Go back to results
                         try:
                             await page.keyboard.press('Escape')
-                        except:
+                        except Exception:
                             pass
-                        await page.wait_for_timeout(1000)
+                        await waits.panel_closed(page)
                         
                         # Progress update every 3 businesses for real-time feedback
                         if businesses_checked % 3 == 0:
@@ -684,7 +970,7 @@ class LeadScraper:
                                         'with_websites': businesses_with_websites,
                                         'total_to_check': max_to_check
                                     }))
-                                except:
+                                except Exception:
                                     pass
                             
                             # If we've checked many but found few, encourage continuing
@@ -699,7 +985,7 @@ class LeadScraper:
                                             'with_websites': businesses_with_websites,
                                             'message': f'Continuing search - found {len(all_leads)} so far'
                                         }))
-                                    except:
+                                    except Exception:
                                         pass
                         
                     except Exception as e:
@@ -707,7 +993,7 @@ class LeadScraper:
                         debug_info.append(f"✗ Error on business {i}: {str(e)[:50]}")
                         try:
                             await page.keyboard.press('Escape')
-                        except:
+                        except Exception:
                             pass
                         continue
                 
@@ -728,8 +1014,6 @@ class LeadScraper:
                         'without_websites': len(all_leads)
                     }
                 }
-            finally:
-                await browser.close()
         
         return {
             'leads': all_leads,
@@ -759,25 +1043,17 @@ class LeadScraper:
         ]
         
         try:
-            async with async_playwright() as p:
-                # Use a fresh browser for better results
-                browser = await p.chromium.launch(
-                    headless=True,  # Set to False to see browser
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage', '--start-maximized']
-                )
+            for search_term in search_terms[:3]:  # Limit to 3 search terms
+                if len(influencers) >= max_results:
+                    break
                 
-                for search_term in search_terms[:3]:  # Limit to 3 search terms
-                    try:
-                        if len(influencers) >= max_results:
-                            break
-                        
-                        # Create NEW context for each search to avoid login prompts
-                        context = await browser.new_context(
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                            viewport={'width': 1920, 'height': 1080},
-                            locale='en-US',
-                            storage_state=None
-                        )
+                try:
+                    # Create NEW context for each search to avoid login prompts
+                    async with self.browser_pool.context(
+                        policy='instagram',
+                        viewport={'width': 1920, 'height': 1080},
+                        locale='en-US'
+                    ) as context:
                         page = await context.new_page()
                         
                         print(f"🔍 Searching Instagram for: {search_term}")
@@ -785,7 +1061,7 @@ class LeadScraper:
                         
                         # Go to Instagram homepage first
                         await page.goto('https://www.instagram.com/', wait_until='networkidle', timeout=30000)
-                        await page.wait_for_timeout(2000)
+                        await waits.selector(page, 'input, a[href^="/"]', timeout=3000, state='attached')
                         
                         # Check if login is required
                         current_url = page.url
@@ -793,12 +1069,11 @@ class LeadScraper:
                             print(f"⚠️ Login required, trying search URL directly...")
                             search_url = f"https://www.instagram.com/explore/tags/{search_term.replace(' ', '')}/"
                             await page.goto(search_url, wait_until='networkidle', timeout=30000)
-                            await page.wait_for_timeout(3000)
+                            await waits.selector(page, 'a[href^="/"]', timeout=3000, state='attached')
                             
                             if 'accounts/login' in page.url:
                                 print(f"⚠️ Still requires login for {search_term}, skipping...")
                                 debug_info.append(f"⚠️ {search_term} requires login, skipping")
-                                await context.close()
                                 continue
                         
                         # Try to use Instagram's search feature via DOM manipulation
@@ -807,9 +1082,9 @@ class LeadScraper:
                             
                             if search_input:
                                 await search_input.click()
-                                await page.wait_for_timeout(1000)
+                                link_count = await waits.count(page, 'a[href^="/"]')
                                 await search_input.fill(search_term)
-                                await page.wait_for_timeout(2000)
+                                await waits.count_grew(page, 'a[href^="/"]', link_count, timeout=3000, fallback_ms=500)
                                 
                                 search_results = await page.evaluate("""
                                     () => {
@@ -835,7 +1110,7 @@ class LeadScraper:
                                 hashtag = search_term.replace(' ', '').replace('influencer', '')
                                 hashtag_url = f"https://www.instagram.com/explore/tags/{hashtag}/"
                                 await page.goto(hashtag_url, wait_until='networkidle', timeout=30000)
-                                await page.wait_for_timeout(3000)
+                                await waits.selector(page, 'a[href^="/"]', timeout=3000, state='attached')
                                 
                                 if 'accounts/login' not in page.url:
                                     search_results = await page.evaluate("""
@@ -871,7 +1146,7 @@ class LeadScraper:
                                 profile_url = f"https://www.instagram.com/{username}/"
                                 
                                 await profile_page.goto(profile_url, wait_until='networkidle', timeout=30000)
-                                await profile_page.wait_for_timeout(3000)
+                                await waits.selector(profile_page, 'meta[property="og:description"]', timeout=3000, state='attached')
                                 
                                 if 'accounts/login' in profile_page.url:
                                     await profile_page.close()
@@ -936,25 +1211,17 @@ class LeadScraper:
                                 print(f"Error checking @{username}: {str(e)}")
                                 try:
                                     await profile_page.close()
-                                except:
+                                except Exception:
                                     pass
                                 continue
+                    
+                    if len(influencers) >= max_results:
+                        break
                         
-                        await context.close()
-                        
-                        if len(influencers) >= max_results:
-                            break
-                            
-                    except Exception as e:
-                        print(f"Error processing search term '{search_term}': {str(e)}")
-                        debug_info.append(f"✗ Error: {str(e)[:50]}")
-                        try:
-                            await context.close()
-                        except:
-                            pass
-                        continue
-                
-                await browser.close()
+                except Exception as e:
+                    print(f"Error processing search term '{search_term}': {str(e)}")
+                    debug_info.append(f"✗ Error: {str(e)[:50]}")
+                    continue
             
         except Exception as e:
             error_msg = f"Error in influencer scraping: {str(e)}"
@@ -1010,7 +1277,43 @@ class LeadScraper:
         
         return 0
 
-scraper = LeadScraper()
+# Shared Chromium pool - launched once at boot and reused by every scrape job
+browser_pool = BrowserPool()
+browser_pool.start_in_background()
+
+# Every scraped lead, persisted in SQLite; sessions reference its rows
+lead_store = LeadStore()
+
+scraper = LeadScraper(browser_pool, lead_store=lead_store)
+query_cache = QueryCache()
+
+# Every scrape mode runs through this - a fixed number of workers and a bounded queue
+scheduler = JobScheduler()
+# Background cache refreshes yield to jobs a user is waiting on
+REFRESH_PRIORITY = 10
+
+def maps_cache_key(location, work_type, fields=None, engine='dom', areas=None):
+    """Query cache key of a Maps search; list mode, the engine and explicit areas give different results"""
+    mode = 'maps' if needs_detail_panel(fields) else 'maps_list'
+    if engine != 'dom':
+        mode = f'{mode}_{engine}'
+    if areas:
+        mode = f"{mode}:{','.join(sorted(area.casefold() for area in areas))}"
+    return normalize_query(location, work_type, mode)
+
+def queue_full_response(error):
+    """429 with a Retry-After estimate when the scrape queue is full"""
+    response = jsonify({
+        'error': 'Too many scrape jobs queued, try again later',
+        'retry_after': error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def scheduled_refresh(make_coro):
+    """Cache refresh producer that queues behind user jobs instead of starting its own browser work"""
+    return lambda: scheduler.submit(lambda: runtime.run(make_coro()), priority=REFRESH_PRIORITY).result()
 
 @app.route('/')
 def index():
@@ -1025,8 +1328,28 @@ def favicon():
     </svg>'''
     return Response(favicon_svg, mimetype='image/svg+xml')
 
-# Store for real-time updates
-scraping_sessions = {}
+# Store for real-time updates - bounded, locked, completed sessions spill to disk
+scraping_sessions = SessionManager(store=lead_store)
+
+class SessionProgress:
+    """Progress sink for the scrapers that records leads straight into a session.
+
+    Scrapers call put() from the runtime loop, so leads show up in
+    /api/scrape-status as soon as they are found.
+    """
+    
+    def __init__(self, session_id):
+        self.session_id = session_id
+    
+    def put(self, item, timeout=None):
+        update_type, data = item
+        if update_type != 'lead':
+            return
+        total = scraping_sessions.append_lead(self.session_id, data)
+        if total:
+            print(f"📊 Session {self.session_id}: Added lead '{data.get('name', 'Unknown')[:30]}...' - Total: {total}")
+        else:
+            print(f"⚠️ Session {self.session_id} not found when trying to add lead")
 
 @app.route('/api/scrape', methods=['POST'])
 def scrape_leads():
@@ -1035,7 +1358,17 @@ def scrape_leads():
         data = request.json
         location = data.get('location', '')
         work_type = data.get('work_type', '')
-        max_results = data.get('max_results', 50)
+        try:
+            max_results = parse_max_results(data.get('max_results'), default=50)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        concurrency = int(data['concurrency']) if data.get('concurrency') else None
+        # Only card fields (name, rating, reviews, category, address, place_url) = fast list mode
+        fields = parse_fields(data.get('fields'))
+        # 'network' parses the Maps search payloads instead of clicking each result (default: MAPS_ENGINE)
+        engine = parse_engine(data.get('engine'))
+        # Neighbourhoods or ZIP codes to search one by one (large requests are tiled automatically otherwise)
+        areas = parse_areas(data.get('areas'))
         
         if not location or not work_type:
             return jsonify({'error': 'Location and work type are required'}), 400
@@ -1043,131 +1376,408 @@ def scrape_leads():
         # Create session ID for tracking
         import uuid
         session_id = str(uuid.uuid4())
-        scraping_sessions[session_id] = {
-            'leads': [],
-            'status': 'processing',
-            'total': 0
-        }
+        cache_key = maps_cache_key(location, work_type, fields, engine, areas)
+        
+        # Repeat searches are answered from the query cache without a browser session
+        entry, state = query_cache.get(cache_key, max_results)
+        if entry is not None:
+            cached_leads = entry['value'][:max_results]
+            scraping_sessions.create(session_id)
+            scraping_sessions.finish(session_id, leads=cached_leads)
+            if state == 'stale':
+                query_cache.refresh_in_background(
+                    cache_key, max_results,
+                    scheduled_refresh(lambda: scraper.scrape_all_sources(location, work_type, max_results, concurrency=concurrency, fields=fields, engine=engine, areas=areas))
+                )
+            return jsonify({
+                'success': True,
+                'session_id': session_id,
+                'leads': cached_leads,
+                'cached': True,
+                'cache_state': state,
+                'message': 'Served from cache'
+            })
+        
+        scraping_sessions.create(session_id, status='queued')
         
         def run_scraping():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
             try:
-                # Create queue for real-time updates
-                progress_queue = queue.Queue()
-                
-                async def scrape_with_updates():
-                    leads = await scraper.scrape_google_maps(location, work_type, max_results, progress_queue)
-                    
-                    # If no results, try Yellow Pages
-                    if not leads:
-                        leads = await scraper.scrape_yellow_pages(location, work_type, max_results)
-                    
-                    return leads
-                
-                # Process updates from queue in background thread
-                import time
-                import threading
-                
-                def process_updates():
-                    start_time = time.time()
-                    print(f"🔄 Starting update processor for session {session_id}")
-                    while True:
-                        try:
-                            update_type, data = progress_queue.get(timeout=2.0)
-                            if update_type == 'lead':
-                                if session_id in scraping_sessions:
-                                    scraping_sessions[session_id]['leads'].append(data)
-                                    scraping_sessions[session_id]['total'] = len(scraping_sessions[session_id]['leads'])
-                                    print(f"📊 Session {session_id}: Added lead '{data.get('name', 'Unknown')[:30]}...' - Total: {len(scraping_sessions[session_id]['leads'])}")
-                                else:
-                                    print(f"⚠️ Session {session_id} not found when trying to add lead")
-                        except queue.Empty:
-                            # Check if scraping is done (status changed) or timeout
-                            if session_id not in scraping_sessions:
-                                print(f"⚠️ Session {session_id} removed, stopping updates")
-                                break
-                            if scraping_sessions[session_id].get('status') != 'processing':
-                                print(f"✅ Scraping status changed, stopping updates")
-                                break
-                            if time.time() - start_time > 300:  # 5 min timeout
-                                print(f"⏰ Update processor timeout")
-                                break
-                            continue
-                        except Exception as update_error:
-                            print(f"❌ Error in update processor: {update_error}")
-                            import traceback
-                            traceback.print_exc()
-                            break
+                if (scraping_sessions.get(session_id) or {}).get('cancel_requested'):
+                    scraping_sessions.finish(session_id, 'cancelled')
+                    return
+                scraping_sessions.update(session_id, status='processing', started_at=datetime.now().isoformat())
+                # Leads are recorded into the session as they are found - no polling thread
+                progress = SessionProgress(session_id)
                 
-                # Start update processor in separate thread
-                update_thread = threading.Thread(target=process_updates, daemon=True)
-                update_thread.start()
-                
-                # Run scraping - this will block until complete
+                # Run scraping on the shared runtime loop - this will block until complete
                 print(f"🚀 Starting scraping for session {session_id}...")
                 print(f"   Location: {location}, Work Type: {work_type}, Max Results: {max_results}")
+                cancelled = False
                 try:
-                    final_leads = loop.run_until_complete(scrape_with_updates())
+                    job = runtime.submit(
+                        scraper.scrape_all_sources(location, work_type, max_results, progress, concurrency, fields, engine,
+                                                   areas=areas),
+                        job_id=session_id
+                    )
+                    # A cancel that arrived before the job was registered is applied here
+                    if (scraping_sessions.get(session_id) or {}).get('cancel_requested'):
+                        job.cancel()
+                    final_leads = job.result()
                     print(f"✅ Scraping complete: {len(final_leads)} leads found")
+                except CancelledError:
+                    print(f"🛑 Scraping cancelled for session {session_id}")
+                    cancelled = True
+                    final_leads = []
                 except Exception as scrape_error:
                     print(f"❌ Scraping failed: {scrape_error}")
                     import traceback
                     traceback.print_exc()
                     final_leads = []
-                    scraping_sessions[session_id]['status'] = 'error'
-                    scraping_sessions[session_id]['error'] = str(scrape_error)
+                    scraping_sessions.update(session_id, error=str(scrape_error))
                 
-                # Wait a bit for any remaining updates to be processed
-                print(f"⏳ Waiting for updates to be processed...")
-                time.sleep(3)
-                
-                # Update session with final results (merge with any real-time updates)
-                if session_id in scraping_sessions and scraping_sessions[session_id]['leads']:
-                    # Use the real-time leads if we have them, otherwise use final
-                    realtime_leads = scraping_sessions[session_id]['leads']
+                # Update session with final results (merge with any real-time updates).
+                # Real-time leads keep their order so status cursors stay valid.
+                session = scraping_sessions.get(session_id)
+                if session is not None and session['leads']:
+                    realtime_leads = list(session['leads'])
                     print(f"📋 Found {len(realtime_leads)} leads from real-time updates")
-                    # Merge with final_leads (avoid duplicates)
-                    final_leads_dict = {lead.get('name', ''): lead for lead in final_leads}
+                    # Append final leads that were not streamed (avoid duplicates)
+                    seen = LeadDeduper()
                     for lead in realtime_leads:
-                        name = lead.get('name', '')
-                        if name and name not in final_leads_dict:
-                            final_leads.append(lead)
-                            final_leads_dict[name] = lead
+                        seen.add(lead)
+                    merged_leads = realtime_leads
+                    for lead in final_leads:
+                        if seen.add(lead):
+                            merged_leads.append(lead)
+                    final_leads = merged_leads
                     print(f"📋 Merged to {len(final_leads)} total leads")
                 
-                if session_id in scraping_sessions:
-                    scraping_sessions[session_id]['leads'] = final_leads
-                    scraping_sessions[session_id]['status'] = 'complete'
-                    scraping_sessions[session_id]['total'] = len(final_leads)
-                    print(f"✅ Session {session_id}: Final count = {len(final_leads)} leads")
+                if session is not None:
+                    failed = bool(session.get('error'))
+                    status = 'cancelled' if cancelled else 'error' if failed else 'complete'
+                    scraping_sessions.finish(session_id, status, leads=final_leads)
+                    print(f"✅ Session {session_id}: Final count = {len(final_leads)} leads ({status})")
+                    if final_leads and status == 'complete':
+                        query_cache.set(cache_key, final_leads, max_results)
                 else:
                     print(f"⚠️ Session {session_id} not found when trying to update final results")
                 
             except Exception as e:
-                scraping_sessions[session_id]['status'] = 'error'
-                scraping_sessions[session_id]['error'] = str(e)
+                scraping_sessions.finish(session_id, 'error', error=str(e))
                 print(f"Scraping error: {e}")
-            finally:
-                loop.close()
         
-        # Start scraping in background thread
-        thread = threading.Thread(target=run_scraping, daemon=True)
-        thread.start()
+        # Queue the job; a scheduler worker picks it up when one is free
+        try:
+            scheduler.submit(run_scraping, job_id=session_id)
+        except QueueFull as e:
+            scraping_sessions.finish(session_id, 'rejected', error=str(e))
+            return queue_full_response(e)
         
         print(f"📝 Created session {session_id} for scraping")
-        print(f"   Sessions active: {len(scraping_sessions)}")
+        print(f"   Sessions: {scraping_sessions.stats()}")
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'message': 'Scraping started'
+            'queue_position': scheduler.position(session_id),
+            'message': 'Scraping queued'
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def cancel_job(session_id):
+    """Stop a queued or running /api/scrape job; returns the session's resulting status"""
+    session = scraping_sessions.get(session_id)
+    if session is None or session.get('status') not in ('queued', 'processing'):
+        return session.get('status') if session else None
+    # Flag first so a job that is just starting sees it even if it is not registered yet
+    scraping_sessions.update(session_id, cancel_requested=True)
+    if scheduler.cancel(session_id):
+        scraping_sessions.finish(session_id, 'cancelled')
+        return 'cancelled'
+    runtime.cancel(session_id)
+    # Pages and contexts close as the cancellation unwinds; give it a moment to finish
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        session = scraping_sessions.get(session_id) or {}
+        if session.get('status') not in ('queued', 'processing'):
+            return session.get('status')
+        scraping_sessions.wait_for_change(session_id, session.get('version', 0), deadline - time.time())
+    return 'cancelling'
+
+@app.route('/api/scrape/<path:session_id>', methods=['DELETE'])
+def cancel_scrape(session_id):
+    """Cancel a queued or running scrape job, keeping the leads found so far"""
+    status = cancel_job(session_id)
+    if status is None:
+        return jsonify({'error': 'Session not found', 'status': 'not_found'}), 404
+    if status not in ('cancelled', 'cancelling'):
+        return jsonify({'success': False, 'status': status, 'message': 'Job already finished'}), 409
+    return jsonify({'success': True, 'session_id': session_id, 'status': status}), 202 if status == 'cancelling' else 200
+
+@app.route('/api/batch', methods=['POST'])
+def create_batch():
+    """Scrape many (location, work_type) pairs as one job with one deduplicated lead list.
+
+    JSON body: `pairs`, or `locations` x `work_types`, plus optional
+    `max_results` (per pair), `fields` and `engine`. A multipart upload with a
+    CSV `file` (location, work_type columns) works too; options go in the form.
+    """
+    try:
+        upload = request.files.get('file')
+        data = request.form.to_dict() if upload else (request.json or {})
+        try:
+            csv_text = upload.read().decode('utf-8-sig') if upload else None
+            pairs = parse_pairs(data, csv_text)
+            max_results = parse_max_results(data.get('max_results'))
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({'error': str(e)}), 400
+        fields = parse_fields(data.get('fields'))
+        engine = parse_engine(data.get('engine'))
+        
+        batch_id = str(uuid.uuid4())
+        scraping_sessions.create(batch_id, status='queued', kind='batch', pairs=pairs)
+        
+        def run_batch():
+            if (scraping_sessions.get(batch_id) or {}).get('cancel_requested'):
+                scraping_sessions.finish(batch_id, 'cancelled')
+                return
+            scraping_sessions.update(batch_id, status='processing', started_at=datetime.now().isoformat())
+            progress = SessionProgress(batch_id)
+            
+            async def run_pair(pair, sink):
+                cache_key = maps_cache_key(pair['location'], pair['work_type'], fields, engine)
+                entry, _ = query_cache.get(cache_key, max_results)
+                if entry is not None:
+                    pair['cached'] = True
+                    return entry['value'][:max_results]
+                leads = await scraper.scrape_all_sources(
+                    pair['location'], pair['work_type'], max_results, sink, fields=fields, engine=engine
+                )
+                if leads:
+                    query_cache.set(cache_key, leads, max_results)
+                return leads
+            
+            batch = BatchRun(
+                pairs, run_pair,
+                on_lead=lambda lead: progress.put(('lead', lead)),
+                on_progress=lambda snapshot: scraping_sessions.update(batch_id, pairs=snapshot)
+            )
+            status = 'complete'
+            try:
+                job = runtime.submit(batch.run(), job_id=batch_id)
+                if (scraping_sessions.get(batch_id) or {}).get('cancel_requested'):
+                    job.cancel()
+                job.result()
+            except CancelledError:
+                status = 'cancelled'
+            except Exception as e:
+                print(f"❌ Batch {batch_id} failed: {e}")
+                scraping_sessions.update(batch_id, error=str(e))
+                status = 'error'
+            scraping_sessions.finish(batch_id, status, pairs=[dict(pair) for pair in batch.pairs],
+                                     summary=batch.summary())
+            print(f"✅ Batch {batch_id}: {batch.summary()} ({status})")
+        
+        try:
+            scheduler.submit(run_batch, job_id=batch_id)
+        except QueueFull as e:
+            scraping_sessions.finish(batch_id, 'rejected', error=str(e))
+            return queue_full_response(e)
+        
+        return jsonify({
+            'success': True,
+            'batch_id': batch_id,
+            'session_id': batch_id,
+            'pairs': len(pairs),
+            'queue_position': scheduler.position(batch_id),
+            'message': f'Batch of {len(pairs)} searches queued'
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch/<path:batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Per-pair progress of a batch; its leads stream through /api/scrape-stream/<batch_id>"""
+    session = scraping_sessions.get(batch_id)
+    if session is None or session.get('kind') != 'batch':
+        return jsonify({'error': 'Batch not found', 'status': 'not_found'}), 404
+    pairs = session.get('pairs', [])
+    by_status = {}
+    for pair in pairs:
+        by_status[pair.get('status', 'queued')] = by_status.get(pair.get('status', 'queued'), 0) + 1
+    return jsonify({
+        'batch_id': batch_id,
+        'status': session['status'],
+        'queue_position': scheduler.position(batch_id),
+        'leads': len(session['leads']),
+        'pairs': pairs,
+        'by_status': by_status,
+        'error': session.get('error')
+    })
+
+@app.route('/api/batch/<path:batch_id>/export', methods=['GET'])
+def export_batch(batch_id):
+    """The batch's consolidated, deduplicated leads as one file (CSV by default, any /api/export format)"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ALL_EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format '{fmt}'", 'formats': ALL_EXPORT_FORMATS}), 400
+    session = scraping_sessions.get(batch_id)
+    if session is None or session.get('kind') != 'batch':
+        return jsonify({'error': 'Batch not found', 'status': 'not_found'}), 404
+    return export_session(batch_id, fmt)
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    """Session registry size and memory use"""
+    return jsonify(scraping_sessions.stats())
+
+@app.route('/api/scheduler-stats', methods=['GET'])
+def scheduler_stats():
+    """Scrape worker occupancy and queue depth, for sizing SCRAPE_WORKERS / SCRAPE_QUEUE_SIZE"""
+    return jsonify(scheduler.stats())
+
+@app.route('/api/runtime-stats', methods=['GET'])
+def runtime_stats():
+    """Shared event loop health: uptime, live tasks, submitted and failed coroutines"""
+    return jsonify(runtime.stats())
+
+@app.route('/api/pool-status', methods=['GET'])
+def pool_status():
+    """Browser pool occupancy, for sizing BROWSER_POOL_SIZE / BROWSER_POOL_CONTEXTS"""
+    return jsonify(browser_pool.stats())
+
+@app.route('/api/resource-stats', methods=['GET'])
+def resource_stats():
+    """Requests blocked per scraper policy and the estimated bandwidth saved"""
+    return jsonify(policies.stats())
+
+@app.route('/api/wait-stats', methods=['GET'])
+def wait_stats():
+    """How long each kind of page wait actually took"""
+    return jsonify(waits.stats())
+
+@app.route('/api/email-stats', methods=['GET'])
+def email_stats():
+    """Email hit rate and latency per extraction path (http vs browser), plus the domain cache"""
+    return jsonify({
+        'extractor': scraper.email_extractor.stats(),
+        'cache': scraper.email_cache.stats()
+    })
+
+@app.route('/api/email-cache', methods=['DELETE'])
+def invalidate_email_cache():
+    """Drop one domain (?domain=example.com) or the whole email cache"""
+    domain = request.args.get('domain')
+    scraper.email_cache.invalidate(email_key(domain) if domain else None)
+    return jsonify({'success': True, 'invalidated': domain or 'all'})
+
+@app.route('/api/store-stats', methods=['GET'])
+def store_stats():
+    """Leads and sessions in the SQLite lead store, and the write-behind queue"""
+    return jsonify(lead_store.stats())
+
+def _flag(name):
+    """Optional boolean query argument: True, False or None when absent"""
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    return value.strip().lower() in ('1', 'true', 'yes', 'y')
+
+@app.route('/api/leads/search', methods=['GET'])
+def search_leads():
+    """Full-text search over every stored lead, before paying for a new scrape.
+
+    `q` matches name, category, address, work type and location (each word as
+    a prefix). Filters: `has_website`, `has_email`, `min_rating`, `work_type`,
+    `location`. Pages hold `limit` leads; pass `next_cursor` back as `cursor`.
+    """
+    try:
+        min_rating = request.args.get('min_rating')
+        started = time.perf_counter()
+        result = lead_store.search(
+            request.args.get('q', ''),
+            has_website=_flag('has_website'),
+            has_email=_flag('has_email'),
+            min_rating=float(min_rating) if min_rating else None,
+            work_type=request.args.get('work_type'),
+            location=request.args.get('location'),
+            limit=request.args.get('limit'),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError:
+        return jsonify({'error': 'min_rating, limit and cursor must be numbers'}), 400
+    result['count'] = len(result['leads'])
+    result['took_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return jsonify(result)
+
+@app.route('/api/leads/nearby', methods=['GET'])
+def nearby_leads():
+    """Stored leads within `radius_km` (default 10) of `lat`,`lng`, nearest first.
+
+    Instead of coordinates, `near` names a place to center on (placed on the
+    map once through the browser pool, then cached). Takes the same `q` and
+    filters as /api/leads/search.
+    """
+    try:
+        radius_km = float(request.args.get('radius_km', 10))
+        min_rating = request.args.get('min_rating')
+        min_rating = float(min_rating) if min_rating else None
+        limit = request.args.get('limit')
+        limit = int(limit) if limit else None
+        if not 0 < radius_km <= 500:
+            return jsonify({'error': 'radius_km must be between 0 and 500'}), 400
+        near = (request.args.get('near') or '').strip()
+        if near:
+            # Usually a cache hit; otherwise one short Maps page load on the shared loop
+            center = runtime.run(scraper.geocode(near), timeout=GEOCODE_TIMEOUT_S)
+            if center is None:
+                return jsonify({'error': f'Could not place {near} on the map'}), 404
+            lat, lng = center[:2]
+        else:
+            lat, lng = float(request.args['lat']), float(request.args['lng'])
+    except FutureTimeout:
+        return jsonify({'error': f'Placing {near} on the map took longer than {GEOCODE_TIMEOUT_S:g}s'}), 504
+    except KeyError:
+        return jsonify({'error': 'Give lat and lng, or near'}), 400
+    except ValueError:
+        return jsonify({'error': 'lat, lng, radius_km, min_rating and limit must be numbers'}), 400
+    
+    started = time.perf_counter()
+    leads = lead_store.nearby(
+        lat, lng, radius_km, request.args.get('q', ''),
+        limit=limit,
+        has_website=_flag('has_website'),
+        has_email=_flag('has_email'),
+        min_rating=min_rating,
+        work_type=request.args.get('work_type'),
+        location=request.args.get('location')
+    )
+    return jsonify({
+        'center': {'lat': lat, 'lng': lng},
+        'radius_km': radius_km,
+        'leads': leads,
+        'count': len(leads),
+        'took_ms': round((time.perf_counter() - started) * 1000, 1)
+    })
+
+@app.route('/api/cache', methods=['GET'])
+def cache_status():
+    """Query cache size and hit counters"""
+    return jsonify(query_cache.stats())
+
+@app.route('/api/cache', methods=['DELETE'])
+def invalidate_cache():
+    """Invalidate one query ({location, work_type, mode}) or the whole query cache"""
+    data = request.get_json(silent=True) or {}
+    if data.get('location') and data.get('work_type'):
+        removed = query_cache.invalidate(normalize_query(data['location'], data['work_type'], data.get('mode', 'maps')))
+    else:
+        removed = query_cache.invalidate()
+    return jsonify({'success': True, 'removed': removed})
+
 @app.route('/api/test', methods=['GET'])
 def test_route():
     """Test route to verify API routing works"""
@@ -1178,33 +1788,143 @@ def test_route():
 
 @app.route('/api/scrape-status/<path:session_id>', methods=['GET'])
 def scrape_status(session_id):
-    """Get real-time scraping status and leads"""
-    print(f"📊 Status check for session: {session_id}")
-    print(f"   Active sessions: {list(scraping_sessions.keys())}")
+    """Get real-time scraping status and the leads found after the `since` cursor.
+
+    `cursor` in the response is the value to send as `since` on the next poll.
+    `version` grows with every change to the session; polls that carry the
+    previous ETag in If-None-Match get 304 while nothing has changed.
+    """
+    try:
+        since = max(int(request.args.get('since', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'since must be a non-negative integer'}), 400
     
-    if session_id not in scraping_sessions:
-        print(f"   ❌ Session not found!")
+    snapshot = scraping_sessions.snapshot(session_id, since)
+    if snapshot is None:
+        print(f"📊 Status check for unknown session: {session_id}")
         return jsonify({
             'error': 'Session not found',
             'status': 'not_found',
             'leads': [],
             'count': 0,
-            'requested_session': session_id,
-            'available_sessions': list(scraping_sessions.keys())
+            'requested_session': session_id
         }), 404
     
-    session = scraping_sessions[session_id]
-    leads = session.get('leads', [])
+    queue_position = scheduler.position(session_id)
+    etag = f'"{snapshot["version"]}-{since}-{queue_position}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            'status': snapshot['status'],
+            'queue_position': queue_position,
+            'leads': snapshot['leads'],
+            'count': len(snapshot['leads']),
+            'total': snapshot['total'],
+            'cursor': snapshot['cursor'],
+            'version': snapshot['version'],
+            'error': snapshot['error']
+        })
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Open /api/scrape-stream connections per session, for cancel-on-disconnect
+stream_watchers = {}
+stream_watchers_lock = threading.Lock()
+
+def watch_stream(session_id, delta, cancel_when_abandoned=False):
+    """Track stream consumers; cancel the job if the last one leaves and nobody reconnects in time"""
+    with stream_watchers_lock:
+        count = stream_watchers.get(session_id, 0) + delta
+        if count > 0:
+            stream_watchers[session_id] = count
+        else:
+            stream_watchers.pop(session_id, None)
+    if count <= 0 and cancel_when_abandoned:
+        def cancel_if_still_abandoned():
+            with stream_watchers_lock:
+                if stream_watchers.get(session_id):
+                    return
+            if cancel_job(session_id) in ('cancelled', 'cancelling'):
+                print(f"🛑 Cancelled session {session_id}: stream client disconnected")
+        timer = threading.Timer(STREAM_DISCONNECT_GRACE_S, cancel_if_still_abandoned)
+        timer.daemon = True
+        timer.start()
+
+def sse_event(payload, event_id=None):
+    """One Server-Sent Events message; `event_id` becomes the client's Last-Event-ID"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+@app.route('/api/scrape-stream/<path:session_id>', methods=['GET'])
+def scrape_stream(session_id):
+    """Server-Sent Events for one /api/scrape job.
+
+    Sends a `lead` event per lead as soon as it is recorded, `status` events
+    while the job is queued or running, comment heartbeats while idle and a
+    final `complete` summary. Lead event ids are lead counts, so a reconnect
+    with Last-Event-ID (or ?last_event_id=) resumes after the last lead seen.
+    If every consumer disconnects and none comes back within
+    STREAM_DISCONNECT_GRACE_S, the job is cancelled.
+    """
+    try:
+        cursor = max(int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0), 0)
+    except ValueError:
+        cursor = 0
+    if scraping_sessions.snapshot(session_id) is None:
+        return jsonify({'error': 'Session not found', 'status': 'not_found'}), 404
     
-    print(f"   ✅ Session found: status={session.get('status')}, leads={len(leads)}")
+    def generate():
+        nonlocal cursor
+        last_status = None
+        finished = False
+        watch_stream(session_id, 1)
+        try:
+            yield "retry: 3000\n\n"
+            while not finished:
+                snapshot = scraping_sessions.snapshot(session_id, cursor)
+                if snapshot is None:
+                    finished = True
+                    yield sse_event({'type': 'error', 'error': 'Session expired'})
+                    return
+                for offset, lead in enumerate(snapshot['leads']):
+                    yield sse_event({'type': 'lead', 'lead': lead, 'index': cursor + offset}, event_id=cursor + offset + 1)
+                cursor = snapshot['cursor']
+                
+                status = (snapshot['status'], scheduler.position(session_id))
+                if status != last_status:
+                    last_status = status
+                    yield sse_event({'type': 'status', 'status': status[0], 'queue_position': status[1], 'count': cursor})
+                
+                if snapshot['status'] not in ('queued', 'processing'):
+                    finished = True
+                    finished_at = snapshot['finished_at'] or time.time()
+                    yield sse_event({
+                        'type': 'complete',
+                        'status': snapshot['status'],
+                        'total': snapshot['total'],
+                        'error': snapshot['error'],
+                        'duration_seconds': round(finished_at - (snapshot['created_at'] or finished_at), 1)
+                    }, event_id=cursor)
+                    return
+                
+                # Queue position is not versioned, so re-check it more often while queued
+                timeout = min(SSE_HEARTBEAT_S, 2) if snapshot['status'] == 'queued' else SSE_HEARTBEAT_S
+                if not scraping_sessions.wait_for_change(session_id, snapshot['version'], timeout):
+                    yield ": heartbeat\n\n"
+        finally:
+            # Runs on normal exit and when the client disconnects (GeneratorExit at a yield)
+            watch_stream(session_id, -1, cancel_when_abandoned=not finished)
     
-    return jsonify({
-        'status': session.get('status', 'processing'),
-        'leads': leads,
-        'count': len(leads),
-        'total': session.get('total', 0),
-        'error': session.get('error')
-    })
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def icp_result_cacheable(result):
+    """Only cache ICP runs that found leads and did not error out"""
+    return isinstance(result, dict) and bool(result.get('leads')) and not result.get('debug', {}).get('error')
 
 @app.route('/api/scrape-icp', methods=['POST'])
 def scrape_icp_leads():
@@ -1218,15 +1938,24 @@ def scrape_icp_leads():
         if not location or not work_type:
             return jsonify({'error': 'Location and work type are required'}), 400
         
-        # Run async scraping for businesses without websites
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        result = loop.run_until_complete(
-            scraper.scrape_businesses_without_websites(location, work_type, max_results)
-        )
-        
-        loop.close()
+        # Run async scraping for businesses without websites on the shared browser pool,
+        # unless the same search is already in the query cache
+        cache_key = normalize_query(location, work_type, 'icp')
+        entry, state = query_cache.get(cache_key, max_results)
+        if entry is None:
+            result = scheduler.submit(lambda: runtime.run(
+                scraper.scrape_businesses_without_websites(location, work_type, max_results)
+            )).result()
+            if icp_result_cacheable(result):
+                query_cache.set(cache_key, result, max_results)
+            entry, state = {'value': result}, 'miss'
+        elif state == 'stale':
+            query_cache.refresh_in_background(
+                cache_key, max_results,
+                scheduled_refresh(lambda: scraper.scrape_businesses_without_websites(location, work_type, max_results)),
+                should_cache=icp_result_cacheable
+            )
+        result = entry['value']
         
         # Handle both old format (list) and new format (dict with debug)
         if isinstance(result, dict):
@@ -1236,14 +1965,18 @@ def scrape_icp_leads():
             leads = result
             debug_info = {}
         
+        leads = leads[:max_results]
         return jsonify({
             'success': True,
             'leads': leads,
             'count': len(leads),
             'mode': 'ICP - Businesses Without Websites',
-            'debug': debug_info
+            'debug': debug_info,
+            'cached': state != 'miss'
         })
         
+    except QueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1255,15 +1988,10 @@ def scrape_influencers():
         min_followers = data.get('min_followers', 10000)
         max_results = data.get('max_results', 50)
         
-        # Run async scraping for influencers
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        result = loop.run_until_complete(
+        # Run async scraping for influencers on the shared browser pool, once a worker is free
+        result = scheduler.submit(lambda: runtime.run(
             scraper.scrape_fitness_influencers(min_followers, max_results)
-        )
-        
-        loop.close()
+        )).result()
         
         # Handle result format
         if isinstance(result, dict):
@@ -1281,6 +2009,8 @@ def scrape_influencers():
             'debug': debug_info
         })
         
+    except QueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1298,103 +2028,161 @@ def scrape_icp_leads_stream():
                 yield f"data: {json.dumps({'error': 'Location and work type are required'})}\n\n"
                 return
             
+            # Same search already answered recently - finish immediately from the cache
+            cache_key = normalize_query(location, work_type, 'icp')
+            entry, state = query_cache.get(cache_key, max_results)
+            if entry is not None:
+                leads = entry['value'].get('leads', [])[:max_results]
+                yield f"data: {json.dumps({'type': 'complete', 'leads': leads, 'count': len(leads), 'debug': entry['value'].get('debug', {}), 'cached': True})}\n\n"
+                return
+            
             # Create a queue for progress updates
             progress_queue = queue.Queue()
+            job_id = str(uuid.uuid4())
+            # Set when the client goes away; the job is cancelled instead of running to the end
+            abandoned = threading.Event()
             
             def run_scraping():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
                 async def scrape_with_updates():
                     result = await scraper.scrape_businesses_without_websites(
                         location, work_type, max_results, progress_queue
                     )
+                    if icp_result_cacheable(result):
+                        query_cache.set(cache_key, result, max_results)
                     progress_queue.put(('complete', result))
                 
-                loop.run_until_complete(scrape_with_updates())
-                loop.close()
+                if abandoned.is_set():
+                    return
+                future = runtime.submit(scrape_with_updates(), job_id=job_id)
+                if abandoned.is_set():
+                    future.cancel()
+                try:
+                    future.result()
+                except CancelledError:
+                    print(f"🛑 ICP stream job {job_id} cancelled: client disconnected")
             
-            # Start scraping in background thread
-            thread = threading.Thread(target=run_scraping)
-            thread.start()
+            # Queue the job on the scheduler
+            try:
+                job = scheduler.submit(run_scraping, job_id=job_id)
+            except QueueFull as e:
+                yield f"data: {json.dumps({'type': 'error', 'error': str(e), 'retry_after': e.retry_after})}\n\n"
+                return
             
-            # Stream progress updates
-            while True:
-                try:
-                    update_type, data = progress_queue.get(timeout=1)
-                    if update_type == 'complete':
-                        if isinstance(data, dict):
-                            leads = data.get('leads', [])
-                            debug_info = data.get('debug', {})
+            # Stream progress updates; if the client disconnects, GeneratorExit lands at a yield
+            last_position = None
+            last_sent = time.time()
+            completed = False
+            try:
+                while True:
+                    try:
+                        update_type, data = progress_queue.get(timeout=1)
+                        last_sent = time.time()
+                        if update_type == 'complete':
+                            if isinstance(data, dict):
+                                leads = data.get('leads', [])
+                                debug_info = data.get('debug', {})
+                            else:
+                                leads = data
+                                debug_info = {}
+                            
+                            completed = True
+                            yield f"data: {json.dumps({'type': 'complete', 'leads': leads, 'count': len(leads), 'debug': debug_info})}\n\n"
+                            break
+                        elif update_type == 'lead':
+                            yield f"data: {json.dumps({'type': 'lead', 'lead': data})}\n\n"
                         else:
-                            leads = data
-                            debug_info = {}
-                        
-                        yield f"data: {json.dumps({'type': 'complete', 'leads': leads, 'count': len(leads), 'debug': debug_info})}\n\n"
+                            yield f"data: {json.dumps({'type': 'progress', 'data': data})}\n\n"
+                    except queue.Empty:
+                        if job.done():
+                            completed = True
+                            error = job.exception() if not job.cancelled() else None
+                            yield f"data: {json.dumps({'type': 'error', 'error': str(error) if error else 'Scraping stopped'})}\n\n"
+                            break
+                        position = scheduler.position(job_id)
+                        if position and position != last_position:
+                            last_position = position
+                            last_sent = time.time()
+                            yield f"data: {json.dumps({'type': 'progress', 'data': {'status': 'queued', 'queue_position': position}})}\n\n"
+                        elif time.time() - last_sent >= SSE_HEARTBEAT_S:
+                            # Writing is how a dropped client is noticed
+                            last_sent = time.time()
+                            yield ": heartbeat\n\n"
+                        continue
+                    except Exception as e:
+                        yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
                         break
-                    else:
-                        yield f"data: {json.dumps({'type': 'progress', 'data': data})}\n\n"
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
-                    break
+            finally:
+                if not completed:
+                    abandoned.set()
+                    if not scheduler.cancel(job_id):
+                        runtime.cancel(job_id)
         
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
     
     return Response(generate(), mimetype='text/event-stream')
 
+# Every format /api/export/<session_id>.<fmt> can produce
+ALL_EXPORT_FORMATS = list(EXPORT_FORMATS) + list(COLUMNAR_FORMATS)
+
+def export_response(leads, fmt, prefix='leads'):
+    """File download of `leads`.
+
+    Text formats are streamed, rows serialized as they are sent. Columnar
+    formats (Parquet, Arrow, XLSX) are written chunk by chunk into a
+    temporary file first, since they need the whole file before sending.
+    """
+    if fmt in COLUMNAR_FORMATS:
+        try:
+            export_file = columnar_file(leads, fmt)
+        except ImportError as e:
+            return jsonify({'error': f'{fmt} export needs {e.name} (pip install -r requirements.txt)'}), 501
+        response = send_file(export_file, mimetype=COLUMNAR_FORMATS[fmt], as_attachment=True,
+                             download_name=export_filename(prefix, fmt))
+        response.headers['X-Lead-Count'] = str(len(leads))
+        return response
+    return Response(
+        iter_export(leads, fmt),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{export_filename(prefix, fmt)}"',
+            'X-Lead-Count': str(len(leads))
+        }
+    )
+
+@app.route('/api/export/<session_id>.<fmt>', methods=['GET'])
+def export_session(session_id, fmt):
+    """Download a session's (or batch's) leads as CSV, JSON, NDJSON, Parquet, Arrow or XLSX straight from the server"""
+    if fmt not in ALL_EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format '{fmt}'", 'formats': ALL_EXPORT_FORMATS}), 400
+    session = scraping_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found', 'status': 'not_found'}), 404
+    leads = session.get('leads', [])
+    if session.get('status') in ('queued', 'processing'):
+        # Still growing - export the leads found so far (copies references only)
+        leads = leads[:]
+    return export_response(leads, fmt, 'batch' if session.get('kind') == 'batch' else 'leads')
+
 @app.route('/api/export/csv', methods=['POST'])
 def export_csv():
+    """CSV of leads posted by the client (prefer GET /api/export/<session_id>.csv)"""
     try:
-        data = request.json
-        leads = data.get('leads', [])
-        
+        leads = (request.json or {}).get('leads', [])
         if not leads:
             return jsonify({'error': 'No leads to export'}), 400
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        if leads:
-            fieldnames = leads[0].keys()
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(leads)
-        
-        output.seek(0)
-        
-        # Create file response
-        filename = f"leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        return export_response(leads, 'csv')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/export/json', methods=['POST'])
 def export_json():
+    """JSON of leads posted by the client (prefer GET /api/export/<session_id>.json)"""
     try:
-        data = request.json
-        leads = data.get('leads', [])
-        
+        leads = (request.json or {}).get('leads', [])
         if not leads:
             return jsonify({'error': 'No leads to export'}), 400
-        
-        filename = f"leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        return send_file(
-            io.BytesIO(json.dumps(leads, indent=2).encode('utf-8')),
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        return export_response(leads, 'json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
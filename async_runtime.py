@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+
+class AsyncRuntime:
+    """One long-lived asyncio event loop on a dedicated thread.
+
+    Every scraping coroutine runs here, so async resources created on the loop
+    (browsers, HTTP connection pools) are shared by all jobs instead of being
+    rebuilt per request. Flask threads hand work over with submit() or run().
+    """
+
+    def __init__(self, name='async-runtime'):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.started_at = None
+        self.submitted = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def start(self):
+        """Start the loop thread (idempotent)"""
+        with self._lock:
+            if self.loop is not None:
+                return self.loop
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name=self.name, daemon=True)
+            self._thread.start()
+            self.started_at = time.time()
+            return self.loop
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro, job_id=None):
+        """Schedule a coroutine on the loop from any thread; returns a concurrent.futures.Future.
+
+        Coroutines submitted with a `job_id` can later be stopped with cancel(job_id).
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError('submit() called from the runtime loop itself - await the coroutine instead')
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        self.submitted += 1
+        future.add_done_callback(self._count_failure)
+        if job_id is not None:
+            with self._lock:
+                self._jobs[job_id] = future
+            future.add_done_callback(lambda _: self._forget(job_id, future))
+        return future
+
+    def _count_failure(self, future):
+        if future.cancelled():
+            self.cancelled += 1
+        elif future.exception() is not None:
+            self.failed += 1
+
+    def _forget(self, job_id, future):
+        with self._lock:
+            if self._jobs.get(job_id) is future:
+                del self._jobs[job_id]
+
+    def cancel(self, job_id):
+        """Cancel a running job; the coroutine gets CancelledError at its next await. False if unknown"""
+        with self._lock:
+            future = self._jobs.get(job_id)
+        return future is not None and future.cancel()
+
+    def run(self, coro, timeout=None, job_id=None):
+        """Run a coroutine on the loop and block the calling thread until it finishes"""
+        future = self.submit(coro, job_id)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def call_soon(self, callback, *args):
+        """Run a plain callback on the loop thread"""
+        self.start()
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stats(self):
+        running = self.loop is not None and self.loop.is_running()
+        tasks = len(asyncio.all_tasks(self.loop)) if running else 0
+        return {
+            'running': running,
+            'uptime_seconds': round(time.time() - self.started_at, 1) if self.started_at else 0,
+            'tasks': tasks,
+            'jobs': len(self._jobs),
+            'submitted': self.submitted,
+            'failed': self.failed,
+            'cancelled': self.cancelled
+        }
+
+
+# Process-wide runtime shared by the browser pool, the email extractor and the routes
+runtime = AsyncRuntime()
@@ -0,0 +1,162 @@
+import asyncio
+import csv
+import io
+import os
+import time
+
+from lead_dedupe import LeadDeduper
+
+# Pairs of one batch scraped at the same time (each pair also runs its sources concurrently)
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 2))
+BATCH_MAX_PAIRS = int(os.environ.get('BATCH_MAX_PAIRS', 500))
+# Largest max_results a batch may ask for per pair
+BATCH_MAX_RESULTS = int(os.environ.get('BATCH_MAX_RESULTS', 500))
+
+
+def _clean(value):
+    return ' '.join(str(value or '').split())
+
+
+def parse_pairs(data=None, csv_text=None):
+    """(location, work_type) pairs from a batch request; raises ValueError when there are none or too many.
+
+    Accepts `pairs` ([{"location", "work_type"}] or [[location, work_type]]),
+    `locations` x `work_types` (every combination), or CSV text with
+    location and work_type columns. Repeated pairs are dropped.
+    """
+    data = data or {}
+    rows = []
+    for pair in data.get('pairs') or []:
+        if isinstance(pair, dict):
+            rows.append((pair.get('location'), pair.get('work_type')))
+        elif isinstance(pair, (list, tuple)) and len(pair) == 2:
+            rows.append(tuple(pair))
+    for location in data.get('locations') or []:
+        for work_type in data.get('work_types') or []:
+            rows.append((location, work_type))
+    if csv_text:
+        reader = csv.DictReader(io.StringIO(csv_text))
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if 'location' not in columns or 'work_type' not in columns:
+            raise ValueError('CSV needs location and work_type columns')
+        for row in reader:
+            rows.append((row.get(columns['location']), row.get(columns['work_type'])))
+
+    pairs = []
+    seen = set()
+    for location, work_type in rows:
+        location, work_type = _clean(location), _clean(work_type)
+        key = (location.casefold(), work_type.casefold())
+        if location and work_type and key not in seen:
+            seen.add(key)
+            pairs.append({'location': location, 'work_type': work_type})
+    if not pairs:
+        raise ValueError('No (location, work_type) pairs given')
+    if len(pairs) > BATCH_MAX_PAIRS:
+        raise ValueError(f'{len(pairs)} pairs given, the limit is {BATCH_MAX_PAIRS}')
+    return pairs
+
+
+def parse_max_results(value, default=20):
+    """Leads wanted per pair; raises ValueError unless it is a whole number from 1 to BATCH_MAX_RESULTS"""
+    if value in (None, ''):
+        return default
+    try:
+        max_results = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('max_results must be a whole number')
+    if not 1 <= max_results <= BATCH_MAX_RESULTS:
+        raise ValueError(f'max_results must be between 1 and {BATCH_MAX_RESULTS}')
+    return max_results
+
+
+class PairSink:
+    """Progress queue handed to the scraper of one pair; leads go through the batch-wide deduper"""
+
+    def __init__(self, batch, pair):
+        self.batch = batch
+        self.pair = pair
+
+    def put(self, item, timeout=None):
+        update_type, data = item
+        if update_type == 'lead':
+            self.batch.add(self.pair, data)
+
+
+class BatchRun:
+    """Scrapes a list of (location, work_type) pairs as one job.
+
+    At most `concurrency` pairs run at once; `run_pair(pair, sink)` returns
+    the coroutine scraping one pair. Leads are deduplicated across the whole
+    batch and handed to `on_lead` as they arrive. Every change of a pair's
+    status or lead count is reported through `on_progress(pairs)`.
+    """
+
+    def __init__(self, pairs, run_pair, on_lead=None, on_progress=None, concurrency=None):
+        self.pairs = [dict(pair, status='queued', leads=0, duplicates=0, error=None, seconds=None) for pair in pairs]
+        self.run_pair = run_pair
+        self.on_lead = on_lead
+        self.on_progress = on_progress
+        self.concurrency = concurrency or BATCH_CONCURRENCY
+        self.deduper = LeadDeduper()
+        self.leads = []
+        self._offered = {}
+
+    def add(self, pair, lead):
+        # Pair scrapers return the leads they already streamed
+        if id(lead) in self._offered:
+            return False
+        # Keeping a reference stops the id from being reused by a later lead
+        self._offered[id(lead)] = lead
+        if not self.deduper.add(lead):
+            pair['duplicates'] += 1
+            self._report()
+            return False
+        self.leads.append(lead)
+        pair['leads'] += 1
+        if self.on_lead:
+            self.on_lead(lead)
+        self._report()
+        return True
+
+    def _report(self):
+        if self.on_progress:
+            self.on_progress([dict(pair) for pair in self.pairs])
+
+    async def _run(self, pair, slots):
+        async with slots:
+            pair['status'] = 'running'
+            self._report()
+            started = time.perf_counter()
+            try:
+                for lead in await self.run_pair(pair, PairSink(self, pair)) or []:
+                    self.add(pair, lead)
+                pair['status'] = 'complete'
+            except asyncio.CancelledError:
+                pair['status'] = 'cancelled'
+                raise
+            except Exception as e:
+                pair['status'] = 'error'
+                pair['error'] = str(e)
+                print(f"⚠️ Batch pair {pair['work_type']} in {pair['location']} failed: {e}")
+            finally:
+                pair['seconds'] = round(time.perf_counter() - started, 1)
+                self._report()
+
+    async def run(self):
+        """Scrape every pair; returns the deduplicated leads of the whole batch"""
+        slots = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(self._run(pair, slots) for pair in self.pairs))
+        finally:
+            for pair in self.pairs:
+                if pair['status'] == 'queued':
+                    pair['status'] = 'cancelled'
+            self._report()
+        return self.leads
+
+    def summary(self):
+        counts = {}
+        for pair in self.pairs:
+            counts[pair['status']] = counts.get(pair['status'], 0) + 1
+        return {'pairs': len(self.pairs), 'leads': len(self.leads), 'duplicates': self.deduper.duplicates, 'by_status': counts}
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from async_runtime import runtime as default_runtime
+from resource_policy import policies
+
+LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+# Upper bound for closing a context, so cancelled jobs free their slot promptly
+CLOSE_TIMEOUT_S = 5
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def _descendant_rss_mb():
+    """Total RSS (MB) of all child processes of this process, or None if /proc is unavailable"""
+    if not os.path.isdir('/proc'):
+        return None
+    parents = {}
+    rss_pages = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            parents[int(entry)] = int(fields[1])
+            rss_pages[int(entry)] = int(fields[21])
+        except (OSError, IndexError, ValueError):
+            continue
+    me = os.getpid()
+    total = 0
+    for pid in rss_pages:
+        current = parents.get(pid)
+        while current and current != me:
+            current = parents.get(current)
+        if current == me:
+            total += rss_pages[pid]
+    return total * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class PooledBrowser:
+    """One long-lived Chromium instance and its usage counters"""
+
+    def __init__(self, browser, slot):
+        self.browser = browser
+        self.slot = slot
+        self.active_contexts = 0
+        self.pages_served = 0
+        self.launched_at = time.time()
+        self.retiring = False
+        self.crashed = False
+
+    def is_usable(self):
+        return not self.crashed and not self.retiring and self.browser.is_connected()
+
+
+class BrowserPool:
+    """Process-wide pool of Chromium browsers handing out one isolated context per job.
+
+    Browsers are launched once and reused. A browser is recycled after serving
+    `max_pages_per_browser` pages or when Chromium's total RSS goes over
+    `max_memory_mb`, and is relaunched if it crashes or disconnects.
+    """
+
+    def __init__(self, size=None, contexts_per_browser=None, max_pages_per_browser=None,
+                 max_memory_mb=None, launch_args=None, runtime=None):
+        self.size = size or int(os.environ.get('BROWSER_POOL_SIZE', 2))
+        self.contexts_per_browser = contexts_per_browser or int(os.environ.get('BROWSER_POOL_CONTEXTS', 4))
+        self.max_pages_per_browser = max_pages_per_browser or int(os.environ.get('BROWSER_POOL_MAX_PAGES', 500))
+        self.max_memory_mb = max_memory_mb or int(os.environ.get('BROWSER_POOL_MAX_MEMORY_MB', 1500))
+        self.launch_args = launch_args or LAUNCH_ARGS
+        self.runtime = runtime or default_runtime
+        self._playwright = None
+        self._browsers = []
+        self._retired = []
+        self._lock = None
+        self._capacity = None
+        self._started = False
+        self._waiting = 0
+        self.launches = 0
+        self.recycles = 0
+        self.crashes = 0
+        self.contexts_served = 0
+
+    async def start(self):
+        """Start Playwright and launch the initial browsers (idempotent)"""
+        if self._started:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._capacity = asyncio.Semaphore(self.size * self.contexts_per_browser)
+        async with self._lock:
+            if self._started:
+                return
+            self._playwright = await async_playwright().start()
+            for slot in range(self.size):
+                self._browsers.append(await self._launch(slot))
+            self._started = True
+            print(f"🧭 Browser pool ready: {self.size} browsers x {self.contexts_per_browser} contexts")
+
+    async def stop(self):
+        """Close every browser and stop Playwright"""
+        if not self._started:
+            return
+        for pooled in self._browsers + self._retired:
+            pooled.retiring = True
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+        self._retired = []
+        await self._playwright.stop()
+        self._playwright = None
+        self._started = False
+
+    async def _launch(self, slot):
+        browser = await self._playwright.chromium.launch(headless=True, args=self.launch_args)
+        pooled = PooledBrowser(browser, slot)
+        browser.on('disconnected', lambda _: self._on_disconnected(pooled))
+        self.launches += 1
+        return pooled
+
+    def _on_disconnected(self, pooled):
+        if not pooled.retiring:
+            pooled.crashed = True
+            self.crashes += 1
+            print(f"⚠️ Browser in slot {pooled.slot} disconnected, it will be relaunched")
+
+    def _needs_recycle(self, pooled):
+        return pooled.pages_served >= self.max_pages_per_browser
+
+    async def _replace(self, pooled):
+        """Swap a browser out of its slot; it is closed once its last context is released"""
+        pooled.retiring = True
+        fresh = await self._launch(pooled.slot)
+        self._browsers[pooled.slot] = fresh
+        if pooled.active_contexts == 0 or pooled.crashed:
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        else:
+            self._retired.append(pooled)
+        return fresh
+
+    async def _checkout(self):
+        async with self._lock:
+            for pooled in list(self._browsers):
+                if pooled.crashed or not pooled.browser.is_connected():
+                    await self._replace(pooled)
+                elif self._needs_recycle(pooled):
+                    self.recycles += 1
+                    print(f"♻️ Recycling browser in slot {pooled.slot} after {pooled.pages_served} pages")
+                    await self._replace(pooled)
+            usable = [b for b in self._browsers if b.is_usable()]
+            if usable:
+                pooled = min(usable, key=lambda b: b.active_contexts)
+            else:
+                # Every slot was retired or lost its browser since the sweep above
+                pooled = await self._replace(min(self._browsers, key=lambda b: b.active_contexts))
+            pooled.active_contexts += 1
+            return pooled
+
+    async def _checkin(self, pooled):
+        async with self._lock:
+            pooled.active_contexts -= 1
+            if pooled in self._retired and pooled.active_contexts == 0:
+                self._retired.remove(pooled)
+                try:
+                    await pooled.browser.close()
+                except Exception:
+                    pass
+            # Retiring browsers keep their RSS until their last context closes; recycling
+            # again before they are gone would count them twice and relaunch every slot
+            if self._retired:
+                return
+            rss_mb = _descendant_rss_mb()
+            if rss_mb is not None and rss_mb > self.max_memory_mb:
+                heaviest = max(self._browsers, key=lambda b: b.pages_served)
+                if not heaviest.retiring:
+                    self.recycles += 1
+                    print(f"♻️ Chromium RSS {rss_mb:.0f} MB over {self.max_memory_mb} MB, recycling slot {heaviest.slot}")
+                    await self._replace(heaviest)
+
+    @asynccontextmanager
+    async def context(self, policy=None, **context_options):
+        """Borrow an isolated browser context for one job; it is closed on exit.
+
+        `policy` names a resource_policy entry ('maps', 'instagram', ...) whose
+        blocked requests are aborted for every page in the context.
+        """
+        await self.start()
+        self._waiting += 1
+        try:
+            await self._capacity.acquire()
+        finally:
+            self._waiting -= 1
+        pooled = None
+        context = None
+        try:
+            pooled = await self._checkout()
+            context_options.setdefault('user_agent', USER_AGENT)
+            context = await pooled.browser.new_context(**context_options)
+            context.on('page', lambda _: self._count_page(pooled))
+            if policy:
+                await policies.apply(context, policy)
+            self.contexts_served += 1
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await asyncio.wait_for(context.close(), CLOSE_TIMEOUT_S)
+                except Exception:
+                    pass
+            if pooled is not None:
+                await self._checkin(pooled)
+            self._capacity.release()
+
+    def _count_page(self, pooled):
+        pooled.pages_served += 1
+
+    def stats(self):
+        """Pool occupancy snapshot for sizing"""
+        capacity = self.size * self.contexts_per_browser
+        in_use = sum(b.active_contexts for b in self._browsers + self._retired)
+        return {
+            'started': self._started,
+            'size': self.size,
+            'contexts_per_browser': self.contexts_per_browser,
+            'capacity': capacity,
+            'in_use': in_use,
+            'available': max(capacity - in_use, 0),
+            'waiting': self._waiting,
+            'utilization': round(in_use / capacity, 3) if capacity else 0,
+            'browsers': [
+                {
+                    'slot': b.slot,
+                    'active_contexts': b.active_contexts,
+                    'pages_served': b.pages_served,
+                    'age_seconds': round(time.time() - b.launched_at, 1),
+                    'connected': b.browser.is_connected()
+                }
+                for b in self._browsers
+            ],
+            'retiring': len(self._retired),
+            'launches': self.launches,
+            'recycles': self.recycles,
+            'crashes': self.crashes,
+            'contexts_served': self.contexts_served,
+            'chromium_rss_mb': _descendant_rss_mb()
+        }
+
+    def start_in_background(self):
+        """Warm the pool up on the shared runtime loop without blocking boot"""
+        future = self.runtime.submit(self.start())
+        future.add_done_callback(self._warm_up_done)
+        return future
+
+    def _warm_up_done(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"⚠️ Browser pool warm-up failed, will retry on first job: {future.exception()}")
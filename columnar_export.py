@@ -0,0 +1,154 @@
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lead_export import EXPORT_FORMATS, iter_export, union_fieldnames
+
+# pandas, pyarrow and openpyxl are imported on first use so the apps start without them
+
+COLUMNAR_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# Typed columns; every other field is a string column
+FLOAT_COLUMNS = ('rating', 'latitude', 'longitude')
+INT_COLUMNS = ('reviews', 'followers', 'min_followers')
+BOOL_COLUMNS = ('has_website', 'has_website_in_google_maps')
+
+# Leads converted to a DataFrame at a time - bounds memory for large sessions
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 50000))
+# Rows per XLSX sheet (Excel's limit is 1,048,576 including the header)
+XLSX_SHEET_ROWS = int(os.environ.get('XLSX_SHEET_ROWS', 1000000))
+
+TRUE_VALUES = {'true', '1', 'yes', 'y'}
+FALSE_VALUES = {'false', '0', 'no', 'n'}
+
+
+def _to_bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().lower()
+    return True if text in TRUE_VALUES else False if text in FALSE_VALUES else None
+
+
+def leads_frame(leads, fieldnames):
+    """DataFrame of `leads` with one column per field and typed numeric/boolean columns"""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(leads, columns=fieldnames)
+    for column in frame.columns:
+        if column in FLOAT_COLUMNS or column in INT_COLUMNS:
+            # Ratings come as text, sometimes with a decimal comma ("4,5")
+            text = frame[column].astype('string').str.replace(',', '.', regex=False)
+            numbers = pd.to_numeric(text, errors='coerce')
+            frame[column] = numbers.round().astype('Int64') if column in INT_COLUMNS else numbers.astype('float64')
+        elif column in BOOL_COLUMNS:
+            frame[column] = frame[column].map(_to_bool).astype('boolean')
+        else:
+            frame[column] = frame[column].astype('string')
+    return frame
+
+
+def _chunks(leads, fieldnames):
+    # At least one (possibly empty) frame, so an empty export still has its columns
+    for start in range(0, max(len(leads), 1), EXPORT_CHUNK_ROWS):
+        yield leads_frame(leads[start:start + EXPORT_CHUNK_ROWS], fieldnames)
+
+
+def write_columnar(leads, fmt, target):
+    """Write `leads` as Parquet, Arrow IPC or XLSX into the binary file object `target`, chunk by chunk"""
+    fieldnames = union_fieldnames(leads)
+    if fmt in ('parquet', 'arrow'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for frame in _chunks(leads, fieldnames):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table.schema) if fmt == 'parquet' else pa.ipc.new_file(target, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif fmt == 'xlsx':
+        import pandas as pd
+
+        with pd.ExcelWriter(target, engine='openpyxl') as writer:
+            sheet, row = 1, 0
+            for frame in _chunks(leads, fieldnames):
+                # A chunk that does not fit on the current sheet continues on the next one
+                while True:
+                    if row >= XLSX_SHEET_ROWS:
+                        sheet, row = sheet + 1, 0
+                    part = frame.iloc[:XLSX_SHEET_ROWS - row]
+                    part.to_excel(writer, sheet_name=f'leads_{sheet}', index=False, header=row == 0,
+                                  startrow=row + 1 if row else 0)
+                    row += len(part)
+                    frame = frame.iloc[len(part):]
+                    if frame.empty:
+                        break
+    else:
+        raise ValueError(f"Unknown columnar format '{fmt}' (use {', '.join(COLUMNAR_FORMATS)})")
+
+
+def columnar_file(leads, fmt):
+    """The export in a temporary file (spilled to disk past 16 MB), rewound and ready to send"""
+    spool = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    try:
+        write_columnar(leads, fmt, spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def _sample_leads(count):
+    """Synthetic Maps-style leads for the benchmark"""
+    rng = random.Random(42)
+    trades = ['Plumber', 'Gym', 'Dentist', 'Bakery', 'Electrician']
+    return [{
+        'name': f'Business {i}',
+        'address': f'{rng.randint(1, 9999)} Main St, Springfield',
+        'phone': f'(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+        'email': f'info@business{i}.com' if i % 3 else '',
+        'website': f'https://business{i}.com' if i % 4 else '',
+        'rating': f'{rng.uniform(3, 5):.1f}',
+        'reviews': rng.randint(0, 2000),
+        'category': rng.choice(trades),
+        'place_url': f'https://www.google.com/maps/place/?q=place_id:ChIJ{i:010d}',
+        'location': 'Springfield',
+        'work_type': rng.choice(trades).lower(),
+        'has_website': bool(i % 4)
+    } for i in range(count)]
+
+
+def benchmark(count=100000):
+    """Size and write time of every export format for `count` synthetic leads"""
+    leads = _sample_leads(count)
+    results = {}
+    for fmt in list(EXPORT_FORMATS) + list(COLUMNAR_FORMATS):
+        started = time.perf_counter()
+        if fmt in EXPORT_FORMATS:
+            size = sum(len(chunk.encode('utf-8')) for chunk in iter_export(leads, fmt))
+        else:
+            buffer = io.BytesIO()
+            write_columnar(leads, fmt, buffer)
+            size = buffer.tell()
+        results[fmt] = {'mb': round(size / (1024 * 1024), 2), 'seconds': round(time.perf_counter() - started, 2)}
+    return results
+
+
+if __name__ == '__main__':
+    # python columnar_export.py [leads]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"📊 Exporting {count:,} synthetic leads")
+    for fmt, result in benchmark(count).items():
+        print(f"   {fmt:8} {result['mb']:>8} MB {result['seconds']:>7} s")
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+
+# Second-level public suffixes where the registrable domain has three labels
+MULTI_PART_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'ltd.uk', 'plc.uk', 'me.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.nz', 'org.nz', 'co.za', 'co.in', 'net.in', 'org.in', 'co.jp', 'ne.jp', 'or.jp',
+    'com.br', 'com.mx', 'com.ar', 'com.sg', 'com.my', 'com.hk', 'com.tr', 'com.cn',
+}
+
+# Domains many unrelated businesses share - a match on them says nothing
+SHARED_DOMAINS = {
+    'facebook.com', 'instagram.com', 'yelp.com', 'google.com', 'business.site', 'linktr.ee',
+    'wixsite.com', 'squarespace.com', 'godaddysites.com', 'weebly.com', 'yellowpages.com',
+    'square.site', 'toasttab.com', 'booksy.com', 'vagaro.com', 'mindbodyonline.com'
+}
+# Path segments of shared hosts that come before the business's own one (/pages/<name>, /view/<name>)
+GENERIC_PATH_SEGMENTS = {'pages', 'page', 'view', 'site', 'biz', 'p', 'pg', 'people', 'profile'}
+
+
+def registrable_domain(url):
+    """Normalize a URL or host to its registrable domain: 'https://www.shop.example.co.uk/x' -> 'example.co.uk'"""
+    if not url:
+        return ''
+    if '://' not in url:
+        url = f'http://{url}'
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    labels = host.split('.')
+    if len(labels) <= 2 or host.replace('.', '').isdigit():
+        return host
+    if '.'.join(labels[-2:]) in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def email_key(url):
+    """Email cache key of a website: its registrable domain, or host plus the business's path segment on
+    shared platforms ('facebook.com/joesplumbing', 'joe.wixsite.com'); '' when it names no single business"""
+    domain = registrable_domain(url)
+    if domain not in SHARED_DOMAINS:
+        return domain
+    parsed = urlparse(url if '://' in url else f'http://{url}')
+    host = (parsed.hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    segments = [segment.lower() for segment in parsed.path.split('/') if segment]
+    segment = next((segment for segment in segments if segment not in GENERIC_PATH_SEGMENTS), '')
+    if host != domain:
+        # A subdomain of its own (joe.wixsite.com)
+        return f'{host}/{segment}' if segment and host == f'sites.{domain}' else host
+    return f'{host}/{segment}' if segment else ''
+
+
+class EmailCache:
+    """Domain-keyed cache of email lookups backed by a local SQLite file.
+
+    Found emails and "no email on this site" results are both stored, each with
+    its own TTL. The least recently used rows are evicted past `max_entries`.
+    WAL mode lets several worker processes share the same file.
+    """
+
+    def __init__(self, path=None, hit_ttl=None, miss_ttl=None, max_entries=None):
+        self.path = path or os.environ.get('EMAIL_CACHE_PATH', os.path.join(DATA_DIR, 'email_cache.sqlite3'))
+        self.hit_ttl = hit_ttl or int(os.environ.get('EMAIL_CACHE_HIT_TTL_S', 30 * 24 * 3600))
+        self.miss_ttl = miss_ttl or int(os.environ.get('EMAIL_CACHE_MISS_TTL_S', 3 * 24 * 3600))
+        self.max_entries = max_entries or int(os.environ.get('EMAIL_CACHE_MAX_ENTRIES', 100000))
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS email_cache (
+                domain TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_email_cache_last_access ON email_cache(last_access)')
+
+    def get(self, domain):
+        """Cached email ('' for a cached negative), or None when unknown or expired"""
+        if not domain:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT email, stored_at FROM email_cache WHERE domain = ?', (domain,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            email, stored_at = row
+            ttl = self.hit_ttl if email else self.miss_ttl
+            if now - stored_at > ttl:
+                self._conn.execute('DELETE FROM email_cache WHERE domain = ?', (domain,))
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE email_cache SET last_access = ? WHERE domain = ?', (now, domain))
+            if email:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return email
+
+    def set(self, domain, email):
+        """Store a lookup result; pass '' to remember that the site has no email"""
+        if not domain:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO email_cache (domain, email, stored_at, last_access) VALUES (?, ?, ?, ?)',
+                (domain, email or '', now, now)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._evict()
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM email_cache').fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM email_cache WHERE domain IN '
+                '(SELECT domain FROM email_cache ORDER BY last_access ASC LIMIT ?)',
+                (count - self.max_entries,)
+            )
+
+    def invalidate(self, domain=None):
+        """Drop one domain, or the whole cache when domain is None"""
+        with self._lock:
+            if domain is None:
+                self._conn.execute('DELETE FROM email_cache')
+            else:
+                self._conn.execute('DELETE FROM email_cache WHERE domain = ?', (domain,))
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM email_cache').fetchone()[0]
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0
+        }
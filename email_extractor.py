@@ -0,0 +1,220 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+
+from resource_policy import policies
+from waits import waits
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+IGNORED_EMAIL_PARTS = ['example.com', 'test.com', 'placeholder']
+# Things that look like emails but are asset names (logo@2x.png) or tracking ids
+IGNORED_EMAIL_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.js', '.css')
+
+CONTACT_LINK_PATTERN = re.compile(r'href=["\']([^"\']*contact[^"\']*)["\']', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'<script.*?</script>|<style.*?</style>|<[^>]+>', re.IGNORECASE | re.DOTALL)
+# Empty single-page-app mount points and "please enable JavaScript" notices
+JS_SHELL_MARKERS = [
+    'enable javascript',
+    'id="root"></div>',
+    'id="__next"></div>',
+    'id="app"></div>',
+    'ng-app',
+]
+
+EMAIL_VISIBLE_JS = """
+    () => /[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}/.test(document.documentElement.innerHTML)
+"""
+
+# What _fetch returns for PDFs, images and other non-HTML links: nothing to search, nothing to render
+NOT_HTML = object()
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def find_emails(html):
+    """All plausible business emails in a page, in document order"""
+    emails = []
+    for email in EMAIL_PATTERN.findall(html):
+        lowered = email.lower()
+        if any(x in lowered for x in IGNORED_EMAIL_PARTS) or lowered.endswith(IGNORED_EMAIL_SUFFIXES):
+            continue
+        if email not in emails:
+            emails.append(email)
+    return emails
+
+
+def needs_javascript(html):
+    """Heuristic: the HTML is an empty shell that only renders with JavaScript"""
+    lowered = html.lower()
+    if any(marker in lowered for marker in JS_SHELL_MARKERS):
+        return True
+    visible_words = len(TAG_PATTERN.sub(' ', lowered).split())
+    return visible_words < 40
+
+
+class EmailExtractor:
+    """Finds a contact email on a lead's website.
+
+    The default path is a pooled aiohttp client (keep-alive connections, DNS
+    cache, per-host connection limit, capped response size). Pages that only
+    render with JavaScript fall back to a tab in the shared browser. Setting
+    EMAIL_EXTRACTOR_MODE=browser forces the old Playwright-only behaviour so hit
+    rate and latency of both paths can be compared via stats().
+    """
+
+    def __init__(self, browser_pool, mode=None, max_bytes=None, timeout=None, per_host_limit=None):
+        self.browser_pool = browser_pool
+        self.mode = mode or os.environ.get('EMAIL_EXTRACTOR_MODE', 'http')
+        self.max_bytes = max_bytes or int(os.environ.get('EMAIL_MAX_RESPONSE_KB', 512)) * 1024
+        self.timeout = timeout or float(os.environ.get('EMAIL_HTTP_TIMEOUT_S', 4))
+        self.per_host_limit = per_host_limit or int(os.environ.get('EMAIL_PER_HOST_LIMIT', 2))
+        self._session = None
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=300,
+                use_dns_cache=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=min(self.timeout, 3)),
+                headers={'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml'}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _record(self, method, elapsed_ms, found, **extra):
+        with self._lock:
+            entry = self._stats.setdefault(method, {'attempts': 0, 'hits': 0, 'total_ms': 0.0})
+            entry['attempts'] += 1
+            entry['total_ms'] += elapsed_ms
+            if found:
+                entry['hits'] += 1
+            for key, value in extra.items():
+                entry[key] = entry.get(key, 0) + value
+
+    async def extract(self, website_url, page=None):
+        """First business email on the site, '' if it has none, None if the site could not be read"""
+        if not website_url or not website_url.startswith('http'):
+            return ''
+        if self.mode == 'browser':
+            return await self._extract_with_browser(website_url, page)
+
+        start = time.perf_counter()
+        html = await self._fetch(website_url)
+        if html is NOT_HTML:
+            self._record('http', (time.perf_counter() - start) * 1000, False, not_html=1)
+            return ''
+        emails = find_emails(html) if html else []
+        if not emails and html:
+            # One cheap extra hop - contact pages are where emails usually live
+            match = CONTACT_LINK_PATTERN.search(html)
+            if match:
+                contact_url = urljoin(website_url, match.group(1))
+                if urlparse(contact_url).netloc == urlparse(website_url).netloc:
+                    contact_html = await self._fetch(contact_url)
+                    emails = find_emails(contact_html) if contact_html and contact_html is not NOT_HTML else []
+        self._record('http', (time.perf_counter() - start) * 1000, bool(emails))
+        if emails:
+            return emails[0]
+
+        if html is None or needs_javascript(html):
+            return await self._extract_with_browser(website_url, page)
+        return ''
+
+    async def _fetch(self, url):
+        """GET a page, reading at most max_bytes; None on failure, NOT_HTML for other content types"""
+        try:
+            return await self._get(url)
+        except aiohttp.ClientSSLError:
+            # Many small-business sites have expired or self-signed certificates. The page is
+            # only read for a public email and nothing is sent, so retry that one request unverified.
+            with self._lock:
+                self._stats.setdefault('http', {'attempts': 0, 'hits': 0, 'total_ms': 0.0})
+                self._stats['http']['unverified_tls'] = self._stats['http'].get('unverified_tls', 0) + 1
+            try:
+                return await self._get(url, ssl=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return None
+
+    async def _get(self, url, **request_options):
+        async with self._get_session().get(url, allow_redirects=True, **request_options) as response:
+            if response.status >= 400:
+                return None
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and 'html' not in content_type and 'text' not in content_type:
+                return NOT_HTML
+            chunks = []
+            size = 0
+            async for chunk in response.content.iter_chunked(16384):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_bytes:
+                    with self._lock:
+                        self._stats.setdefault('http', {'attempts': 0, 'hits': 0, 'total_ms': 0.0})
+                        self._stats['http']['truncated'] = self._stats['http'].get('truncated', 0) + 1
+                    break
+            return b''.join(chunks)[:self.max_bytes].decode(response.charset or 'utf-8', errors='ignore')
+
+    async def _extract_with_browser(self, website_url, page=None):
+        """Render the site in a tab of the shared browser (the original extraction path)"""
+        start = time.perf_counter()
+        emails = []
+        try:
+            if page is not None:
+                emails = await self._render_and_find(page.context, website_url)
+            else:
+                async with self.browser_pool.context(policy='website') as context:
+                    emails = await self._render_and_find(context, website_url)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            emails = None
+        self._record('browser', (time.perf_counter() - start) * 1000, bool(emails))
+        if emails is None:
+            return None
+        return emails[0] if emails else ''
+
+    async def _render_and_find(self, context, website_url):
+        new_page = await context.new_page()
+        try:
+            # Page routes win over the context's, so this also applies inside a Maps context
+            await policies.apply(new_page, 'website')
+            await new_page.goto(website_url, wait_until='networkidle', timeout=10000)
+            await waits.until(new_page, 'email_visible', EMAIL_VISIBLE_JS, timeout=2000)
+            return find_emails(await new_page.content())
+        finally:
+            await new_page.close()
+
+    def stats(self):
+        """Hit rate and latency per extraction path"""
+        with self._lock:
+            result = {'mode': self.mode}
+            for method, entry in self._stats.items():
+                attempts = entry['attempts']
+                result[method] = dict(
+                    entry,
+                    total_ms=round(entry['total_ms'], 1),
+                    hit_rate=round(entry['hits'] / attempts, 3) if attempts else 0,
+                    avg_ms=round(entry['total_ms'] / attempts, 1) if attempts else 0
+                )
+            return result
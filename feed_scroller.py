@@ -0,0 +1,179 @@
+import asyncio
+import os
+import time
+
+from maps_cards import READ_CARD_JS
+
+FEED_MAX_SCROLLS = int(os.environ.get('FEED_MAX_SCROLLS', 40))
+FEED_STALL_LIMIT = int(os.environ.get('FEED_STALL_LIMIT', 3))
+FEED_SCROLL_WAIT_MS = int(os.environ.get('FEED_SCROLL_WAIT_MS', 2500))
+
+BINDING_NAME = 'leadFeedCards'
+
+# Reports cards already in the feed, then every card appended to it, through the exposed binding
+FEED_OBSERVER_JS = """
+    () => {
+        if (window.__leadFeedObserver) return true;
+        const readCard = %s;
+        const seen = new Set();
+        const report = (root) => {
+            const links = root.matches && root.matches('a[href*="/maps/place/"]')
+                ? [root]
+                : Array.from(root.querySelectorAll ? root.querySelectorAll('a[href*="/maps/place/"]') : []);
+            const cards = [];
+            for (const link of links) {
+                const card = readCard(link);
+                if (!card || seen.has(card.place_url)) continue;
+                seen.add(card.place_url);
+                cards.push(card);
+            }
+            return cards;
+        };
+        const feed = document.querySelector('div[role="feed"]') || document.body;
+        const initial = report(feed);
+        if (initial.length) window.%s(initial);
+        window.__leadFeedObserver = new MutationObserver((records) => {
+            const cards = [];
+            for (const record of records) {
+                for (const node of record.addedNodes) {
+                    if (node.nodeType === 1) cards.push(...report(node));
+                }
+            }
+            if (cards.length) window.%s(cards);
+        });
+        window.__leadFeedObserver.observe(feed, {childList: true, subtree: true});
+        return !!document.querySelector('div[role="feed"]');
+    }
+""" % (READ_CARD_JS.strip(), BINDING_NAME, BINDING_NAME)
+
+# Scrolls the results feed itself (not the window) and reports whether the end marker is showing
+SCROLL_FEED_JS = """
+    () => {
+        const feed = document.querySelector('div[role="feed"]');
+        if (!feed) return {feed: false, end: true};
+        feed.scrollTop = feed.scrollHeight;
+        const marker = feed.querySelector('span.HlvSq') ||
+            Array.from(feed.querySelectorAll('span, p')).slice(-20)
+                .find(el => /end of the list/i.test(el.textContent || ''));
+        return {feed: true, end: !!marker};
+    }
+"""
+
+
+class FeedScroller:
+    """Scrolls a Google Maps results feed and hands over cards as they are appended.
+
+    An in-page MutationObserver reads each new card and passes it to Python
+    through an exposed binding, so callers can start on the first results
+    (via `on_cards` or the `urls` queue) while scrolling continues. Scrolling
+    stops at `target` cards, at the "end of the list" marker, or after
+    `stall_limit` scrolls in a row that load nothing new.
+    """
+
+    def __init__(self, page, on_cards=None, max_scrolls=None, stall_limit=None, wait_ms=None):
+        self.page = page
+        self.on_cards = on_cards
+        self.max_scrolls = max_scrolls or FEED_MAX_SCROLLS
+        self.stall_limit = stall_limit or FEED_STALL_LIMIT
+        self.wait_ms = wait_ms or FEED_SCROLL_WAIT_MS
+        self.cards = []
+        self.urls = asyncio.Queue()
+        self.done = asyncio.Event()
+        self.stop_reason = None
+        self.scrolls = 0
+        self._seen = set()
+        self._grew = asyncio.Event()
+        self._started = False
+        self._stopped = False
+        self._first_card_at = None
+        self._started_at = None
+
+    async def start(self):
+        """Install the binding and the observer; returns False when the page has no results feed"""
+        if not self._started:
+            self._started = True
+            self._started_at = time.perf_counter()
+            await self.page.expose_binding(BINDING_NAME, self._receive)
+        return await self.page.evaluate(FEED_OBSERVER_JS)
+
+    def _receive(self, source, cards):
+        fresh = []
+        for card in cards or []:
+            url = card.get('place_url')
+            if url and url not in self._seen:
+                self._seen.add(url)
+                fresh.append(card)
+        if not fresh:
+            return
+        if self._first_card_at is None:
+            self._first_card_at = time.perf_counter()
+        self.cards.extend(fresh)
+        for card in fresh:
+            self.urls.put_nowait(card['place_url'])
+        self._grew.set()
+        if self.on_cards:
+            self.on_cards(fresh)
+
+    async def scroll(self, target):
+        """Scroll until `target` cards have been seen or the feed ends; returns the stop reason"""
+        if not self._started:
+            await self.start()
+        stalls = 0
+        reason = 'max_scrolls'
+        try:
+            while self.scrolls < self.max_scrolls:
+                if self._stopped:
+                    reason = 'stopped'
+                    break
+                if len(self.cards) >= target:
+                    reason = 'target'
+                    break
+                before = len(self.cards)
+                self._grew.clear()
+                state = await self.page.evaluate(SCROLL_FEED_JS)
+                self.scrolls += 1
+                if not state['feed']:
+                    reason = 'no_feed'
+                    break
+                if len(self.cards) == before:
+                    try:
+                        await asyncio.wait_for(self._grew.wait(), self.wait_ms / 1000)
+                    except asyncio.TimeoutError:
+                        pass
+                if len(self.cards) > before:
+                    stalls = 0
+                elif state['end']:
+                    reason = 'end_of_list'
+                    break
+                else:
+                    stalls += 1
+                    if stalls >= self.stall_limit:
+                        reason = 'stalled'
+                        break
+        finally:
+            self.stop_reason = reason
+            self.done.set()
+            # Wakes consumers blocked on the URL queue
+            self.urls.put_nowait(None)
+        return reason
+
+    def stop(self):
+        """Stop scrolling early (the caller has enough) and release anyone waiting on next_url()"""
+        self._stopped = True
+        self.urls.put_nowait(None)
+
+    async def next_url(self):
+        """Next place URL as cards arrive; None once scrolling has finished and the queue is drained"""
+        url = await self.urls.get()
+        if url is None:
+            # Leave the marker for the other consumers
+            self.urls.put_nowait(None)
+        return url
+
+    def stats(self):
+        return {
+            'cards': len(self.cards),
+            'scrolls': self.scrolls,
+            'stop_reason': self.stop_reason,
+            'first_card_ms': round((self._first_card_at - self._started_at) * 1000) if self._first_card_at else None
+        }
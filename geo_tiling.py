@@ -0,0 +1,120 @@
+import math
+import os
+import re
+import urllib.parse
+
+from lead_dedupe import place_id
+
+# Searches asking for more than this are split into tiles (one Maps search tops out around 120 places)
+TILE_THRESHOLD = int(os.environ.get('MAPS_TILE_THRESHOLD', 100))
+TILE_ZOOM = float(os.environ.get('MAPS_TILE_ZOOM', 14))
+TILE_MAX_RINGS = int(os.environ.get('MAPS_TILE_MAX_RINGS', 3))
+TILE_CONCURRENCY = int(os.environ.get('MAPS_TILE_CONCURRENCY', 3))
+# A ring of tiles averaging fewer new places than this ends the expansion
+TILE_MIN_NEW = float(os.environ.get('MAPS_TILE_MIN_NEW', 2))
+# Tiles scraped for the same work type within this many seconds are served from the lead store (0 = always scrape)
+TILE_REUSE_S = int(os.environ.get('MAPS_TILE_REUSE_S', 3 * 24 * 3600))
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Browser viewport the tiles are sized for (Playwright's default)
+VIEWPORT_PX = (1280, 720)
+
+VIEWPORT_PATTERN = re.compile(r'@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?),(\d+(?:\.\d+)?)z')
+# The place's own pin in a /maps/place/ URL's data part ("...!3d30.2672!4d-97.7431...")
+PIN_PATTERN = re.compile(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)')
+
+
+def parse_viewport(url):
+    """(lat, lng, zoom) from a Maps URL's "@lat,lng,zoomz" part, or None"""
+    match = VIEWPORT_PATTERN.search(url or '')
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2)), float(match.group(3))
+
+
+def place_coordinates(url):
+    """(lat, lng) of a /maps/place/ URL: the place's pin, else the map center; None if neither is there"""
+    match = PIN_PATTERN.search(url or '')
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    viewport = parse_viewport(url)
+    return viewport[:2] if viewport else None
+
+
+def place_reference(url):
+    """place_url, place_id, latitude and longitude for a lead read from the place page at `url`"""
+    if '/maps/place/' not in (url or ''):
+        return {'place_url': '', 'place_id': '', 'latitude': None, 'longitude': None}
+    latitude, longitude = place_coordinates(url) or (None, None)
+    return {
+        'place_url': url.split('?')[0],
+        'place_id': place_id({'place_url': url}),
+        'latitude': latitude,
+        'longitude': longitude
+    }
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the circle, for a bounding-box index lookup"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lng_delta = lat_delta / max(math.cos(math.radians(lat)), 0.01)
+    return lat - lat_delta, lat + lat_delta, max(lng - lng_delta, -180.0), min(lng + lng_delta, 180.0)
+
+
+def tile_box(lat, lng, zoom):
+    """(min_lat, max_lat, min_lng, max_lng) covered by the tile centered on (lat, lng)"""
+    lat_step, lng_step = tile_span(lat, zoom)
+    return lat - lat_step / 2, lat + lat_step / 2, lng - lng_step / 2, lng + lng_step / 2
+
+
+def tile_span(lat, zoom):
+    """(lat_step, lng_step) in degrees covered by one viewport at this zoom (web mercator)"""
+    degrees_per_px = 360 / (256 * 2 ** zoom)
+    return VIEWPORT_PX[1] * degrees_per_px * math.cos(math.radians(lat)), VIEWPORT_PX[0] * degrees_per_px
+
+
+def grid_ring(lat, lng, ring, zoom=None):
+    """Tiles (lat, lng, zoom) forming square ring `ring` around the center; ring 0 is the center tile"""
+    zoom = zoom or TILE_ZOOM
+    lat_step, lng_step = tile_span(lat, zoom)
+    cells = [
+        (row, col)
+        for row in range(-ring, ring + 1)
+        for col in range(-ring, ring + 1)
+        if max(abs(row), abs(col)) == ring
+    ]
+    return [(round(lat + row * lat_step, 6), round(lng + col * lng_step, 6), zoom) for row, col in cells]
+
+
+def search_url(query, viewport=None):
+    """Maps search URL, pinned to a (lat, lng, zoom) viewport when given"""
+    url = f"https://www.google.com/maps/search/{urllib.parse.quote_plus(query)}"
+    if viewport:
+        lat, lng, zoom = viewport
+        url += f"/@{lat},{lng},{zoom:g}z"
+    return url
+
+
+def tiled_budget(per_tile, areas=None, concurrency=None):
+    """Time budget of a whole tiled search: enough waves of `concurrency` tiles for every tile it may
+    run (each area, or every ring up to MAPS_TILE_MAX_RINGS), plus one for placing the location"""
+    tiles = len(areas) if areas else (2 * TILE_MAX_RINGS + 1) ** 2
+    waves = math.ceil(tiles / (concurrency or TILE_CONCURRENCY))
+    return per_tile * (waves + (0 if areas else 1))
+
+
+def parse_areas(value):
+    """Sub-areas (neighbourhoods, ZIP codes) from a list or comma-separated string"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(area).strip() for area in value if str(area).strip()]
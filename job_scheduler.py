@@ -0,0 +1,106 @@
+import bisect
+import itertools
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    """Raised by JobScheduler.submit when no more jobs can be queued"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Scrape queue is full, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """Runs scrape jobs on a fixed number of worker threads.
+
+    Jobs wait in a bounded priority queue (lower number runs first, FIFO within
+    a priority). When the queue is full, submit() raises QueueFull carrying a
+    Retry-After estimate based on recent job durations.
+    """
+
+    def __init__(self, workers=None, max_queue=None):
+        self.workers = workers or int(os.environ.get('SCRAPE_WORKERS', 2))
+        self.max_queue = max_queue or int(os.environ.get('SCRAPE_QUEUE_SIZE', 20))
+        self._queue = []
+        self._running = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._avg_duration = 60.0
+        self.completed = 0
+        self.rejected = 0
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f'scrape-worker-{i}', daemon=True).start()
+
+    def submit(self, fn, job_id=None, priority=0):
+        """Queue `fn()` to run on a worker; returns a concurrent.futures.Future"""
+        job_id = job_id or str(uuid.uuid4())
+        future = Future()
+        future.job_id = job_id
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(self._retry_after())
+            bisect.insort(self._queue, (priority, next(self._seq), job_id, fn, future))
+            self._cond.notify()
+        return future
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                _, _, job_id, fn, future = self._queue.pop(0)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._running[job_id] = time.time()
+            started = time.time()
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.time() - started)
+                    self.completed += 1
+
+    def position(self, job_id):
+        """0 while running, 1-based place in line while queued, None when unknown or finished"""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            for index, item in enumerate(self._queue):
+                if item[2] == job_id:
+                    return index + 1
+        return None
+
+    def cancel(self, job_id):
+        """Drop a job that has not started yet; returns True if it was removed"""
+        with self._cond:
+            for index, item in enumerate(self._queue):
+                if item[2] == job_id:
+                    del self._queue[index]
+                    item[4].cancel()
+                    return True
+        return False
+
+    def _retry_after(self):
+        return max(1, math.ceil(self._avg_duration * (len(self._queue) + 1) / self.workers))
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'running': len(self._running),
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_job_seconds': round(self._avg_duration, 1)
+            }
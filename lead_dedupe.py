@@ -0,0 +1,206 @@
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+from email_cache import SHARED_DOMAINS, registrable_domain
+
+# Country calling code assumed for numbers written without one
+DEFAULT_COUNTRY_CODE = os.environ.get('DEDUPE_DEFAULT_COUNTRY_CODE', '1')
+# Name similarity (0-1) at which two leads in the same block are the same business
+NAME_THRESHOLD = float(os.environ.get('DEDUPE_NAME_THRESHOLD', 0.85))
+
+STREET_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'boulevard': 'blvd', 'road': 'rd', 'drive': 'dr', 'lane': 'ln',
+    'court': 'ct', 'place': 'pl', 'square': 'sq', 'highway': 'hwy', 'parkway': 'pkwy', 'suite': 'ste',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w', 'floor': 'fl', 'apartment': 'apt'
+}
+
+NAME_NOISE = {'the', 'llc', 'inc', 'co', 'corp', 'ltd', 'company', 'and'}
+
+# Maps place references: "place_id:ChIJ..." links and the "!1s0x...:0x..." feature id in /maps/place/ URLs
+PLACE_ID_PATTERNS = [re.compile(r'place_id[:=]([A-Za-z0-9_-]+)'), re.compile(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)')]
+
+
+def normalize_phone(phone):
+    """E.164 form ('+15551234567') or '' when there are too few digits"""
+    if not phone:
+        return ''
+    digits = re.sub(r'\D', '', phone)
+    if phone.strip().startswith('+'):
+        return f'+{digits}' if len(digits) >= 8 else ''
+    if digits.startswith('00'):
+        return f'+{digits[2:]}' if len(digits) >= 10 else ''
+    if DEFAULT_COUNTRY_CODE == '1' and len(digits) == 11 and digits.startswith('1'):
+        return f'+{digits}'
+    if len(digits) == 10:
+        return f'+{DEFAULT_COUNTRY_CODE}{digits}'
+    return ''
+
+
+def normalize_domain(website):
+    """Registrable domain of the website, '' for shared platforms (social pages, site builders)"""
+    domain = registrable_domain(website)
+    return '' if domain in SHARED_DOMAINS else domain
+
+
+def normalize_address(address):
+    """Case-folded address with punctuation removed and street words abbreviated"""
+    words = re.sub(r'[^a-z0-9 ]', ' ', (address or '').lower().replace('&', ' and ')).split()
+    return ' '.join(STREET_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def normalize_name(name):
+    words = re.sub(r"[^a-z0-9 ]", ' ', (name or '').lower().replace("'", '').replace('&', ' and ')).split()
+    return ' '.join(word for word in words if word not in NAME_NOISE)
+
+
+def place_id(lead):
+    """Maps place reference from the lead's place_id or place_url, '' if there is none"""
+    if lead.get('place_id'):
+        return lead['place_id']
+    url = lead.get('place_url') or ''
+    for pattern in PLACE_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return ''
+
+
+def place_id_kind(value):
+    """'feature' for the DOM's '0x...:0x...' feature ids, 'place' for payload 'ChIJ...' place ids"""
+    return 'feature' if value.startswith('0x') else 'place'
+
+
+def keys_conflict(keys, other):
+    """True when place ids of the same kind or the street addresses say two leads are different businesses"""
+    ids = keys['place_id'], other['place_id']
+    if all(ids) and place_id_kind(ids[0]) == place_id_kind(ids[1]) and ids[0] != ids[1]:
+        return True
+    return bool(keys['block'] and other['block'] and keys['block'] != other['block'])
+
+
+def name_similarity(a, b):
+    """0-1 similarity of two normalized names; 1 when one name's words contain the other's"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    words_a, words_b = set(a.split()), set(b.split())
+    if words_a <= words_b or words_b <= words_a:
+        return 1.0
+    return max(
+        SequenceMatcher(None, a, b).ratio(),
+        SequenceMatcher(None, ' '.join(sorted(words_a)), ' '.join(sorted(words_b))).ratio()
+    )
+
+
+def lead_keys(lead):
+    """Normalized identity of a lead: name, E.164 phone, domain, address, address block and place id"""
+    address = normalize_address(lead.get('address'))
+    # Street number plus first street word: catches "123 Main St" vs "123 Main Street, Suite 4"
+    block = ' '.join(address.split()[:2]) if address[:1].isdigit() else ''
+    return {
+        'name': normalize_name(lead.get('name')),
+        'phone': normalize_phone(lead.get('phone')),
+        'domain': normalize_domain(lead.get('website')),
+        'address': address,
+        'block': block,
+        'place_id': place_id(lead)
+    }
+
+
+class LeadDeduper:
+    """Finds duplicate leads through blocking indexes on normalized keys.
+
+    A lead is looked up only against the leads sharing one of its blocks
+    (place id, E.164 phone, website domain, street address prefix, or the
+    exact name for leads with nothing else), so a lookup costs the same with
+    a hundred leads indexed as with millions. Inside a block:
+    - the same place id is the same business (different place ids of the
+      same kind are different businesses);
+    - so is the same phone number, unless the street addresses disagree;
+    - the same domain or street address is, when the names are similar
+      (DEDUPE_NAME_THRESHOLD) and the addresses don't disagree.
+    Branches of a chain (same name, different address) stay separate.
+    """
+
+    INDEXED = ('place_id', 'phone', 'domain', 'block', 'name')
+
+    def __init__(self, name_threshold=None):
+        self.name_threshold = name_threshold or NAME_THRESHOLD
+        self._records = {}
+        self._index = {field: {} for field in self.INDEXED}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def _candidates(self, keys):
+        found = []
+        for field in self.INDEXED:
+            if field == 'name' and (keys['phone'] or keys['domain'] or keys['block'] or keys['place_id']):
+                # Name alone only decides for leads that have nothing else to compare
+                continue
+            value = keys[field]
+            for record_id in self._index[field].get(value, ()) if value else ():
+                if record_id not in found:
+                    found.append(record_id)
+        return found
+
+    def _same(self, keys, other):
+        # The DOM and payload engines reference the same place differently; ids only decide when comparable
+        ids = keys['place_id'], other['place_id']
+        if all(ids) and place_id_kind(ids[0]) == place_id_kind(ids[1]):
+            return ids[0] == ids[1]
+        # Chain branches share a central number, so a different address outweighs the phone
+        if keys_conflict(keys, other):
+            return False
+        if keys['phone'] and keys['phone'] == other['phone']:
+            return True
+        shared = (keys['domain'] and keys['domain'] == other['domain']) or (keys['block'] and keys['block'] == other['block'])
+        if shared:
+            return name_similarity(keys['name'], other['name']) >= self.name_threshold
+        # Nothing but the name to go on
+        bare = not any(keys[f] or other[f] for f in ('phone', 'domain', 'block', 'place_id'))
+        return bare and keys['name'] == other['name']
+
+    def match(self, lead):
+        """Id of the indexed lead this one duplicates, or None"""
+        keys = lead_keys(lead)
+        with self._lock:
+            return self._match(keys)
+
+    def _match(self, keys):
+        for record_id in self._candidates(keys):
+            if self._same(keys, self._records[record_id]):
+                return record_id
+        return None
+
+    def add(self, lead, lead_id=None):
+        """Index a lead unless it duplicates one already indexed; True if it was new"""
+        keys = lead_keys(lead)
+        if not keys['name'] and not keys['phone'] and not keys['place_id']:
+            return False
+        with self._lock:
+            if self._match(keys) is not None:
+                self.duplicates += 1
+                return False
+            if lead_id is None:
+                lead_id = self._next_id
+                self._next_id += 1
+            self._records[lead_id] = keys
+            for field in self.INDEXED:
+                if keys[field]:
+                    self._index[field].setdefault(keys[field], []).append(lead_id)
+            return True
+
+    def __len__(self):
+        return len(self._records)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'leads': len(self._records),
+                'duplicates': self.duplicates,
+                'blocks': {field: len(index) for field, index in self._index.items()}
+            }
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+# Formats the streaming exporters produce: mimetype and file extension
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+def union_fieldnames(leads):
+    """Every key used by any lead, in first-seen order (ICP and influencer leads add their own columns)"""
+    return list(dict.fromkeys(key for lead in leads for key in lead))
+
+
+def iter_csv(leads, fieldnames=None):
+    """CSV text chunk by chunk: the header, then one row per lead"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames or union_fieldnames(leads), restval='')
+    writer.writeheader()
+    for lead in leads:
+        writer.writerow(lead)
+        # Hand over what was written and reuse the buffer, so memory stays at one row
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_json(leads):
+    """A JSON array written one lead at a time"""
+    yield '['
+    for index, lead in enumerate(leads):
+        yield (',\n' if index else '\n') + json.dumps(lead, default=str)
+    yield '\n]\n'
+
+
+def iter_ndjson(leads):
+    """One JSON object per line"""
+    for lead in leads:
+        yield json.dumps(lead, default=str) + '\n'
+
+
+def iter_export(leads, fmt):
+    if fmt == 'csv':
+        # No leads still gets a header-less empty file rather than an error
+        return iter_csv(leads) if leads else iter([])
+    if fmt == 'json':
+        return iter_json(leads)
+    if fmt == 'ndjson':
+        return iter_ndjson(leads)
+    raise ValueError(f"Unknown export format '{fmt}' (use {', '.join(EXPORT_FORMATS)})")
+
+
+def export_filename(prefix, fmt):
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
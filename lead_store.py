@@ -0,0 +1,560 @@
+import json
+import math
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from geo_tiling import distance_km, radius_box, tile_box
+from lead_dedupe import keys_conflict, lead_keys
+
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+
+# Lead fields that get their own column; the full dict is kept in `data`
+COLUMNS = ('place_id', 'phone', 'domain', 'name', 'address', 'category', 'work_type', 'location', 'email',
+           'website', 'rating', 'reviews')
+
+# Columns of the full-text index (external content: the text lives only in `leads`)
+FTS_COLUMNS = ('name', 'category', 'address', 'work_type', 'location')
+
+SEARCH_LIMIT = int(os.environ.get('LEAD_SEARCH_LIMIT', 50))
+SEARCH_MAX_LIMIT = 500
+# nearby() reads this many candidates per requested lead, closest to the center first
+NEARBY_OVERFETCH = 4
+
+
+def _number(value, kind):
+    try:
+        return kind(str(value).replace(',', '.')) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def fts_query(text):
+    """FTS5 query matching every word of `text` as a prefix ("roof austin" finds "Roofing, Austin TX")"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text or ''))
+
+
+def website_column(lead):
+    """The lead's website, or '' for placeholders such as ICP leads' 'Not Listed in Google Maps'"""
+    website = str(lead.get('website') or '').strip()
+    if lead.get('has_website') is False or ' ' in website or '.' not in website:
+        return ''
+    return website
+
+
+def lead_row(lead):
+    """Column values of a lead, with normalized phone, domain and place id for the indexes"""
+    keys = lead_keys(lead)
+    return {
+        'place_id': keys['place_id'] or None,
+        'phone': keys['phone'] or None,
+        'domain': keys['domain'] or None,
+        'name': lead.get('name') or lead.get('username') or '',
+        'address': lead.get('address') or '',
+        'category': lead.get('category') or '',
+        'work_type': lead.get('work_type') or '',
+        'location': lead.get('location') or '',
+        'email': lead.get('email') or '',
+        'website': website_column(lead),
+        'rating': _number(lead.get('rating'), float),
+        'reviews': _number(lead.get('reviews'), int),
+        # Identity for leads without place id or phone: normalized name and address
+        'identity': f"name:{keys['name']}|{keys['address']}"
+    }
+
+
+class LeadStore:
+    """Every lead ever scraped, in a local SQLite file (WAL mode).
+
+    Writes are queued and applied by one writer thread in batches of up to
+    `batch_size` (or every `flush_interval` seconds), so scrapers on the event
+    loop never wait for the disk. A lead already stored (same place id, phone,
+    or normalized name and address) is updated in place. Sessions reference
+    lead rows through `session_leads` instead of keeping copies. Leads with
+    coordinates, and the Maps tiles already scraped, are in R*Tree indexes.
+    """
+
+    def __init__(self, path=None, batch_size=None, flush_interval=None):
+        self.path = path or os.environ.get('LEAD_STORE_PATH', os.path.join(DATA_DIR, 'leads.sqlite3'))
+        self.batch_size = batch_size or int(os.environ.get('LEAD_STORE_BATCH', 200))
+        self.flush_interval = flush_interval or int(os.environ.get('LEAD_STORE_FLUSH_MS', 500)) / 1000
+        self._queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        # Queued writes per session id, so readers only wait for the writer when they have to
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._reader = self._connect()
+        self._create_schema(self._reader)
+        self._thread = threading.Thread(target=self._write_loop, name='lead-store-writer', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _create_schema(self, conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS leads (
+                id INTEGER PRIMARY KEY,
+                identity TEXT NOT NULL UNIQUE,
+                place_id TEXT,
+                phone TEXT,
+                domain TEXT,
+                name TEXT NOT NULL,
+                address TEXT,
+                category TEXT,
+                work_type TEXT,
+                location TEXT,
+                email TEXT,
+                website TEXT,
+                rating REAL,
+                reviews INTEGER,
+                data TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_leads_place_id ON leads(place_id);
+            CREATE INDEX IF NOT EXISTS idx_leads_phone ON leads(phone);
+            CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads(domain);
+            CREATE INDEX IF NOT EXISTS idx_leads_work_type ON leads(work_type COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_leads_location ON leads(location COLLATE NOCASE);
+
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                status TEXT,
+                kind TEXT,
+                error TEXT,
+                created_at REAL,
+                finished_at REAL
+            );
+
+            CREATE TABLE IF NOT EXISTS session_leads (
+                session_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                lead_id INTEGER NOT NULL REFERENCES leads(id),
+                PRIMARY KEY (session_id, position)
+            ) WITHOUT ROWID;
+        """)
+        self._create_search_index(conn)
+        self._create_spatial_index(conn)
+        # Rows written before website_column() existed kept placeholder text as their website
+        conn.execute("UPDATE leads SET website = '' WHERE website != '' AND (website LIKE '% %' OR website NOT LIKE '%.%')")
+
+    @staticmethod
+    def _create_search_index(conn):
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'leads_fts'").fetchone()
+        columns = ', '.join(FTS_COLUMNS)
+        new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+        old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+        changed = ' OR '.join(f'old.{c} IS NOT new.{c}' for c in FTS_COLUMNS)
+        conn.executescript(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5(
+                {columns}, content='leads', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS leads_fts_insert AFTER INSERT ON leads BEGIN
+                INSERT INTO leads_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS leads_fts_delete AFTER DELETE ON leads BEGIN
+                INSERT INTO leads_fts(leads_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS leads_fts_update AFTER UPDATE ON leads WHEN {changed} BEGIN
+                INSERT INTO leads_fts(leads_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO leads_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END;
+        """)
+        if not exists:
+            # Stores created before the search index existed
+            conn.execute("INSERT INTO leads_fts(leads_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def _create_spatial_index(conn):
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'leads_geo'").fetchone()
+        conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS leads_geo USING rtree(id, min_lat, max_lat, min_lng, max_lng);
+
+            CREATE TABLE IF NOT EXISTS scraped_tiles (
+                id INTEGER PRIMARY KEY,
+                work_type TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                zoom REAL NOT NULL,
+                leads INTEGER,
+                scraped_at REAL NOT NULL,
+                detail TEXT,
+                engine TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS tiles_geo USING rtree(id, min_lat, max_lat, min_lng, max_lng);
+        """)
+        tile_columns = {row[1] for row in conn.execute('PRAGMA table_info(scraped_tiles)')}
+        for column in ('detail', 'engine'):
+            if column not in tile_columns:
+                # Tiles recorded without it are never reused: their detail level is unknown
+                conn.execute(f'ALTER TABLE scraped_tiles ADD COLUMN {column} TEXT')
+        if not exists:
+            # Leads stored before the spatial index existed
+            conn.execute("""
+                INSERT INTO leads_geo
+                SELECT id, lat, lat, lng, lng FROM (
+                    SELECT id, CAST(json_extract(data, '$.latitude') AS REAL) AS lat,
+                           CAST(json_extract(data, '$.longitude') AS REAL) AS lng
+                    FROM leads
+                    WHERE json_extract(data, '$.latitude') IS NOT NULL AND json_extract(data, '$.longitude') IS NOT NULL
+                )
+            """)
+
+    # Queueing (any thread, never blocks)
+
+    def _track(self, session_id, delta):
+        if session_id is None:
+            return
+        with self._pending_lock:
+            count = self._pending.get(session_id, 0) + delta
+            if count > 0:
+                self._pending[session_id] = count
+            else:
+                self._pending.pop(session_id, None)
+
+    def is_pending(self, session_id):
+        """True while writes for this session are queued but not yet committed"""
+        with self._pending_lock:
+            return session_id in self._pending
+
+    def record_lead(self, lead, session_id=None, position=None):
+        """Store a lead, and reference it as lead number `position` of a session when given"""
+        self._track(session_id, 1)
+        self._queue.put(('lead', session_id, position, lead))
+
+    def record_session_leads(self, session_id, leads):
+        """Make the session reference exactly `leads`, in order (a session's final lead list)"""
+        self._track(session_id, 1)
+        self._queue.put(('session_leads', session_id, list(leads)))
+
+    def record_session(self, session_id, **fields):
+        """Upsert a session's status, kind, error, created_at or finished_at"""
+        self._track(session_id, 1)
+        self._queue.put(('session', session_id, fields))
+
+    def record_tile(self, work_type, lat, lng, zoom, leads=0, detail='full', engine='dom'):
+        """Remember that the Maps tile centered on (lat, lng) was fully scraped for `work_type`.
+
+        `detail` ('full' or 'cards', see maps_cards.detail_level) and `engine`
+        say what the stored leads contain; only a request asking for the same
+        reuses the tile.
+        """
+        self._queue.put(('tile', work_type, lat, lng, zoom, leads, detail, engine))
+
+    def flush(self, timeout=5):
+        """Wait until everything queued so far is written; False on timeout"""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    # Writer thread
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                if batch[-1][0] == 'flush':
+                    # Someone is waiting - write now instead of filling the batch
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write_batch(conn, batch)
+
+    def _write_batch(self, conn, batch):
+        flushed = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for item in batch:
+                if item[0] == 'lead':
+                    _, session_id, position, lead = item
+                    lead_id = self._upsert_lead(conn, lead)
+                    if session_id is not None and lead_id is not None:
+                        conn.execute('INSERT OR REPLACE INTO session_leads VALUES (?, ?, ?)',
+                                     (session_id, position, lead_id))
+                elif item[0] == 'session_leads':
+                    _, session_id, leads = item
+                    conn.execute('DELETE FROM session_leads WHERE session_id = ?', (session_id,))
+                    for position, lead in enumerate(leads):
+                        lead_id = self._upsert_lead(conn, lead)
+                        if lead_id is not None:
+                            conn.execute('INSERT OR REPLACE INTO session_leads VALUES (?, ?, ?)',
+                                         (session_id, position, lead_id))
+                elif item[0] == 'session':
+                    self._upsert_session(conn, item[1], item[2])
+                elif item[0] == 'tile':
+                    self._insert_tile(conn, *item[1:])
+                elif item[0] == 'flush':
+                    flushed.append(item[1])
+            conn.execute('COMMIT')
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.failed += len(batch) - len(flushed)
+            print(f"⚠️ Lead store write failed ({len(batch)} items): {e}")
+            try:
+                conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+        finally:
+            for item in batch:
+                if item[0] in ('lead', 'session_leads', 'session'):
+                    self._track(item[1], -1)
+            for done in flushed:
+                done.set()
+
+    def _find(self, conn, row, keys):
+        if row['place_id']:
+            found = conn.execute('SELECT id, data FROM leads WHERE place_id = ? LIMIT 1', (row['place_id'],)).fetchone()
+            if found:
+                return found
+        # A shared phone or name and address is the same business only when place ids and addresses agree,
+        # as in LeadDeduper._same (chain branches share a central number)
+        candidates = []
+        if row['phone']:
+            candidates += conn.execute('SELECT id, data FROM leads WHERE phone = ?', (row['phone'],)).fetchall()
+        candidates += conn.execute('SELECT id, data FROM leads WHERE identity = ?', (row['identity'],)).fetchall()
+        for found in candidates:
+            if not keys_conflict(keys, lead_keys(json.loads(found[1]))):
+                return found
+        return None
+
+    @staticmethod
+    def _new_identity(conn, row):
+        # Leads _find kept apart can still share a phone or a name and address; each needs its own identity
+        options = [f"place:{row['place_id']}" if row['place_id'] else None,
+                   f"phone:{row['phone']}" if row['phone'] else None, row['identity']]
+        for identity in filter(None, options):
+            if conn.execute('SELECT 1 FROM leads WHERE identity = ?', (identity,)).fetchone() is None:
+                return identity
+        return f"{row['identity']}|{row['place_id'] or row['phone']}"
+
+    def _upsert_lead(self, conn, lead):
+        row = lead_row(lead)
+        if not row['name'] and not row['phone'] and not row['place_id']:
+            return None
+        now = time.time()
+        found = self._find(conn, row, lead_keys(lead))
+        if found is None:
+            identity = self._new_identity(conn, row)
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO leads (identity, {', '.join(COLUMNS)}, data, first_seen, last_seen) "
+                f"VALUES (?, {', '.join('?' for _ in COLUMNS)}, ?, ?, ?)",
+                (identity, *(row[c] for c in COLUMNS), json.dumps(lead, default=str), now, now)
+            )
+            self.written += 1
+            if cursor.rowcount:
+                lead_id = cursor.lastrowid
+            else:
+                lead_id = conn.execute('SELECT id FROM leads WHERE identity = ?', (identity,)).fetchone()[0]
+            self._index_coordinates(conn, lead_id, lead)
+            return lead_id
+        lead_id, data = found
+        # Newer values win, but an empty field never erases what an earlier scrape found
+        merged = json.loads(data)
+        merged.update({k: v for k, v in lead.items() if v not in (None, '')})
+        row = lead_row(merged)
+        conn.execute(
+            f"UPDATE leads SET {', '.join(f'{c} = ?' for c in COLUMNS)}, data = ?, last_seen = ? WHERE id = ?",
+            (*(row[c] for c in COLUMNS), json.dumps(merged, default=str), now, lead_id)
+        )
+        self.written += 1
+        self._index_coordinates(conn, lead_id, merged)
+        return lead_id
+
+    @staticmethod
+    def _index_coordinates(conn, lead_id, lead):
+        lat, lng = _number(lead.get('latitude'), float), _number(lead.get('longitude'), float)
+        if lat is not None and lng is not None:
+            conn.execute('INSERT OR REPLACE INTO leads_geo VALUES (?, ?, ?, ?, ?)', (lead_id, lat, lat, lng, lng))
+
+    @staticmethod
+    def _insert_tile(conn, work_type, lat, lng, zoom, leads, detail, engine):
+        cursor = conn.execute(
+            'INSERT INTO scraped_tiles (work_type, lat, lng, zoom, leads, scraped_at, detail, engine) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (work_type, lat, lng, zoom, leads, time.time(), detail, engine)
+        )
+        conn.execute('INSERT INTO tiles_geo VALUES (?, ?, ?, ?, ?)', (cursor.lastrowid, *tile_box(lat, lng, zoom)))
+
+    @staticmethod
+    def _upsert_session(conn, session_id, fields):
+        fields = {k: v for k, v in fields.items() if k in ('status', 'kind', 'error', 'created_at', 'finished_at')}
+        conn.execute('INSERT OR IGNORE INTO sessions (session_id) VALUES (?)', (session_id,))
+        if fields:
+            conn.execute(
+                f"UPDATE sessions SET {', '.join(f'{k} = ?' for k in fields)} WHERE session_id = ?",
+                (*fields.values(), session_id)
+            )
+
+    # Reads
+
+    def session(self, session_id):
+        """A session rebuilt from the store (metadata plus its leads), or None if it was never stored"""
+        with self._read_lock:
+            meta = self._reader.execute(
+                'SELECT status, kind, error, created_at, finished_at FROM sessions WHERE session_id = ?', (session_id,)
+            ).fetchone()
+        if meta is None:
+            return None
+        leads = self.session_leads(session_id)
+        status, kind, error, created_at, finished_at = meta
+        session = {'status': status, 'error': error, 'created_at': created_at, 'finished_at': finished_at,
+                   'leads': leads, 'total': len(leads), 'version': 0}
+        if kind:
+            session['kind'] = kind
+        return session
+
+    def session_leads(self, session_id):
+        with self._read_lock:
+            rows = self._reader.execute(
+                'SELECT l.data FROM session_leads s JOIN leads l ON l.id = s.lead_id '
+                'WHERE s.session_id = ? ORDER BY s.position',
+                (session_id,)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def search(self, text='', has_website=None, has_email=None, min_rating=None, work_type=None, location=None,
+               limit=None, cursor=None):
+        """Stored leads matching `text` (every word, as a prefix, in name, category, address, work type or location).
+
+        Newest leads first. Pages are keyed on the lead id: pass the returned
+        `next_cursor` as `cursor` to get the next page, which stays fast however
+        deep it goes. Filters are ANDed; None means "don't care".
+        """
+        limit = min(max(int(limit or SEARCH_LIMIT), 1), SEARCH_MAX_LIMIT)
+        conditions, params = self._filters(has_website, has_email, min_rating, work_type, location)
+        query = fts_query(text)
+        if query:
+            # Ordering and paging on the FTS rowid lets FTS5 walk matches newest first and stop at the limit
+            source, key = 'leads_fts JOIN leads l ON l.id = leads_fts.rowid', 'leads_fts.rowid'
+            conditions.append('leads_fts MATCH ?')
+            params.append(query)
+        else:
+            source, key = 'leads l', 'l.id'
+        if cursor:
+            conditions.append(f'{key} < ?')
+            params.append(int(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._read_lock:
+            rows = self._reader.execute(
+                f'SELECT l.id, l.data FROM {source} {where} ORDER BY {key} DESC LIMIT ?', (*params, limit + 1)
+            ).fetchall()
+        page = rows[:limit]
+        return {
+            'leads': [dict(json.loads(data), lead_id=lead_id) for lead_id, data in page],
+            'next_cursor': page[-1][0] if len(rows) > limit else None
+        }
+
+    @staticmethod
+    def _filters(has_website=None, has_email=None, min_rating=None, work_type=None, location=None):
+        """SQL conditions on the `leads l` row, and their parameters"""
+        conditions, params = [], []
+        if has_website is not None:
+            conditions.append("l.website != ''" if has_website else "l.website = ''")
+        if has_email is not None:
+            conditions.append("l.email != ''" if has_email else "l.email = ''")
+        if min_rating is not None:
+            conditions.append('l.rating >= ?')
+            params.append(float(min_rating))
+        if work_type:
+            conditions.append('l.work_type = ? COLLATE NOCASE')
+            params.append(work_type)
+        if location:
+            conditions.append('l.location = ? COLLATE NOCASE')
+            params.append(location)
+        return conditions, params
+
+    def _in_box(self, box, text='', limit=None, with_ids=True, near=None, **filters):
+        conditions, params = self._filters(**filters)
+        conditions[:0] = ['g.min_lat >= ?', 'g.max_lat <= ?', 'g.min_lng >= ?', 'g.max_lng <= ?']
+        params[:0] = box
+        query = fts_query(text)
+        if query:
+            conditions.append('l.id IN (SELECT rowid FROM leads_fts WHERE leads_fts MATCH ?)')
+            params.append(query)
+        sql = f"SELECT l.id, l.data FROM leads_geo g JOIN leads l ON l.id = g.id WHERE {' AND '.join(conditions)}"
+        if near:
+            # Flat-earth distance: close enough to rank candidates, and SQLite keeps only the top `limit`
+            lat, lng = near
+            sql += ' ORDER BY (g.min_lat - ?) * (g.min_lat - ?) + (g.min_lng - ?) * (g.min_lng - ?) * ?'
+            params += [lat, lat, lng, lng, math.cos(math.radians(lat)) ** 2]
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+        if not with_ids:
+            return [json.loads(data) for _, data in rows]
+        return [dict(json.loads(data), lead_id=lead_id) for lead_id, data in rows]
+
+    def nearby(self, lat, lng, radius_km, text='', limit=None, **filters):
+        """Stored leads within `radius_km` of (lat, lng), nearest first, each with its `distance_km`.
+
+        The R*Tree narrows the search to the circle's bounding box, of which
+        only the NEARBY_OVERFETCH * `limit` leads closest to the center are
+        read; exact distances are then computed for those leads only. Takes the
+        same `text` and filters as search().
+        """
+        limit = min(max(int(limit or SEARCH_LIMIT), 1), SEARCH_MAX_LIMIT)
+        found = []
+        candidates = self._in_box(radius_box(lat, lng, radius_km), text, limit=limit * NEARBY_OVERFETCH,
+                                  near=(lat, lng), **filters)
+        for lead in candidates:
+            distance = distance_km(lat, lng, float(lead['latitude']), float(lead['longitude']))
+            if distance <= radius_km:
+                found.append(dict(lead, distance_km=round(distance, 3)))
+        found.sort(key=lambda lead: lead['distance_km'])
+        return found[:limit]
+
+    def recent_tile(self, work_type, lat, lng, zoom, max_age, detail='full', engine='dom'):
+        """True if a tile covering this whole tile was scraped for `work_type`, at the same detail level
+        and with the same engine, in the last `max_age` seconds"""
+        min_lat, max_lat, min_lng, max_lng = tile_box(lat, lng, zoom)
+        with self._read_lock:
+            row = self._reader.execute(
+                'SELECT 1 FROM tiles_geo g JOIN scraped_tiles t ON t.id = g.id '
+                'WHERE g.min_lat <= ? AND g.max_lat >= ? AND g.min_lng <= ? AND g.max_lng >= ? '
+                'AND t.work_type = ? COLLATE NOCASE AND t.detail = ? AND t.engine = ? AND t.scraped_at >= ? LIMIT 1',
+                (min_lat, max_lat, min_lng, max_lng, work_type, detail, engine, time.time() - max_age)
+            ).fetchone()
+        return row is not None
+
+    def leads_in_tile(self, work_type, lat, lng, zoom, limit=None):
+        """Stored `work_type` leads whose coordinates fall inside the tile, as plain lead dicts (no `lead_id`)"""
+        return self._in_box(tile_box(lat, lng, zoom), limit=limit, with_ids=False, work_type=work_type)
+
+    def stats(self):
+        with self._read_lock:
+            leads = self._reader.execute('SELECT COUNT(*) FROM leads').fetchone()[0]
+            sessions = self._reader.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+            located = self._reader.execute('SELECT COUNT(*) FROM leads_geo').fetchone()[0]
+            tiles = self._reader.execute('SELECT COUNT(*) FROM scraped_tiles').fetchone()[0]
+        return {
+            'leads': leads,
+            'leads_with_coordinates': located,
+            'scraped_tiles': tiles,
+            'sessions': sessions,
+            'queued_writes': self._queue.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'failed': self.failed
+        }
@@ -0,0 +1,79 @@
+import re
+
+from geo_tiling import place_reference
+
+# Fields readable straight off a result card in the Maps feed, no detail panel needed
+CARD_FIELDS = ('name', 'rating', 'reviews', 'category', 'address', 'place_url')
+
+# Reads one result card from its /maps/place/ link; null when the card has no name yet
+READ_CARD_JS = """
+    (link) => {
+        const card = link.closest('div[role="article"]') || link.closest('div.Nv2PK') || link.parentElement;
+        const text = (selector) => {
+            const el = card && card.querySelector(selector);
+            return el && el.textContent ? el.textContent.trim() : '';
+        };
+
+        const name = link.getAttribute('aria-label') || text('.qBF1Pd') || text('.fontHeadlineSmall');
+        if (!name) return null;
+
+        const stars = card && card.querySelector('span[role="img"][aria-label*="star"]');
+        const starsLabel = stars ? stars.getAttribute('aria-label') : '';
+        const rating = text('span.MW4etd') || (starsLabel.match(/[0-9]+[.,][0-9]/) || [''])[0];
+        const reviewText = text('span.UY7F9') || (starsLabel.match(/([0-9][0-9,.]*)\\s+review/i) || ['', ''])[1];
+
+        // First info row reads like "Category · <icons> · Short address"
+        const rows = card ? Array.from(card.querySelectorAll('.W4Efsd'))
+            .filter(row => !row.querySelector('.W4Efsd'))
+            .map(row => Array.from(row.children).map(part => part.textContent.replace(/·/g, '').trim()).filter(Boolean))
+            .filter(parts => parts.length) : [];
+        const info = rows.find(parts => !/^[0-9][.,][0-9]/.test(parts[0])) || [];
+
+        return {
+            name: name.trim(),
+            rating: rating,
+            reviews: reviewText.replace(/[^0-9]/g, ''),
+            category: info[0] || '',
+            address: info.length > 1 ? info[info.length - 1] : '',
+            place_url: link.href.split('?')[0]
+        };
+    }
+"""
+
+
+def parse_fields(value):
+    """Requested lead fields from a list or comma-separated string; None means every field"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [str(field).strip().lower() for field in value if str(field).strip()]
+    return fields or None
+
+
+def needs_detail_panel(fields):
+    """True unless every requested field is on the result card (None = all fields, so yes)"""
+    return fields is None or any(field not in CARD_FIELDS for field in fields)
+
+
+def detail_level(fields):
+    """'cards' when the request is served from result cards alone, else 'full' (detail panels opened)"""
+    return 'full' if needs_detail_panel(fields) else 'cards'
+
+
+def card_to_lead(card, location, work_type):
+    """Lead dict in the usual shape; detail-only fields are left empty"""
+    reviews = card.get('reviews') or ''
+    return {
+        'name': card.get('name', ''),
+        'address': card.get('address', ''),
+        'phone': '',
+        'email': '',
+        'website': '',
+        'rating': card.get('rating', ''),
+        'reviews': int(reviews) if re.fullmatch(r'\d+', reviews) else None,
+        'category': card.get('category', ''),
+        **place_reference(card.get('place_url', '')),
+        'location': location,
+        'work_type': work_type
+    }
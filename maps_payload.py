@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+# 'dom' reads the page (cards, detail panels); 'network' parses the search payloads the page fetches
+MAPS_ENGINES = ('dom', 'network')
+MAPS_ENGINE = os.environ.get('MAPS_ENGINE', 'dom').strip().lower()
+
+XSSI_PREFIX = ")]}'"
+
+# Responses that carry search results: the feed's XHRs and the place previews
+PAYLOAD_URL_MARKERS = ('tbm=map', '/maps/preview/place', '/maps/rpc/vp')
+
+# Initial results are embedded in the page rather than fetched
+INITIAL_STATE_JS = "() => window.APP_INITIALIZATION_STATE || null"
+
+MAX_DEPTH = 14
+
+
+def parse_engine(value):
+    """Requested Maps extraction engine, falling back to MAPS_ENGINE (and to 'dom' if that is unknown)"""
+    engine = str(value or MAPS_ENGINE).strip().lower()
+    return engine if engine in MAPS_ENGINES else 'dom'
+
+
+def _at(node, *path):
+    """node[path[0]][path[1]]... or None when any step is missing"""
+    for key in path:
+        try:
+            node = node[key]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return node
+
+
+def decode_payload(text):
+    """JSON value of a Maps response body (XSSI prefix, {"d": ...} wrapper and /*""*/ tail removed); None if unreadable"""
+    if not isinstance(text, str):
+        return None
+    text = text.strip()
+    if text.endswith('/*""*/'):
+        text = text[:-6]
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(value, dict) and isinstance(value.get('d'), str):
+        return decode_payload(value['d'])
+    return value
+
+
+def _looks_like_place(node):
+    return (
+        isinstance(node, list) and len(node) > 30
+        and isinstance(_at(node, 11), str)
+        and isinstance(_at(node, 9, 2), (int, float))
+    )
+
+
+def iter_places(node, depth=0):
+    """Every place record inside a decoded payload, in payload order"""
+    if depth > MAX_DEPTH:
+        return
+    if isinstance(node, str):
+        # Payloads nest further payloads as strings (e.g. APP_INITIALIZATION_STATE)
+        if node.startswith(XSSI_PREFIX):
+            yield from iter_places(decode_payload(node), depth + 1)
+        return
+    if not isinstance(node, list):
+        return
+    if _looks_like_place(node):
+        yield node
+        return
+    for child in node:
+        yield from iter_places(child, depth + 1)
+
+
+def _unwrap_redirect(url):
+    # Websites are sometimes wrapped as /url?q=<real url>
+    if url and '/url?' in url:
+        target = parse_qs(urlparse(url).query).get('q')
+        if target:
+            return target[0]
+    return url or ''
+
+
+def parse_place(info):
+    """Plain dict of the fields we use from one place record"""
+    address = _at(info, 39)
+    if not isinstance(address, str):
+        parts = _at(info, 2)
+        address = ', '.join(p for p in parts if isinstance(p, str)) if isinstance(parts, list) else ''
+    phone = _at(info, 178, 0, 0) or _at(info, 178, 0, 3) or ''
+    categories = _at(info, 13)
+    rating = _at(info, 4, 7)
+    reviews = _at(info, 4, 8)
+    place_id = _at(info, 78)
+    return {
+        'name': info[11].strip(),
+        'address': address,
+        'phone': phone if isinstance(phone, str) else '',
+        'website': _unwrap_redirect(_at(info, 7, 0)),
+        'rating': str(rating) if isinstance(rating, (int, float)) else '',
+        'reviews': reviews if isinstance(reviews, int) else None,
+        'category': categories[0] if isinstance(categories, list) and categories and isinstance(categories[0], str) else '',
+        'place_id': place_id if isinstance(place_id, str) else '',
+        'latitude': _at(info, 9, 2),
+        'longitude': _at(info, 9, 3)
+    }
+
+
+def parse_payload(text):
+    """Places found in one raw response body"""
+    return [parse_place(info) for info in iter_places(decode_payload(text))]
+
+
+def place_to_lead(place, location, work_type, email=''):
+    """Lead dict in the same shape the DOM scrapers produce"""
+    place_id = place.get('place_id')
+    return {
+        'name': place['name'],
+        'address': place.get('address', ''),
+        'phone': place.get('phone', ''),
+        'email': email,
+        'website': place.get('website', ''),
+        'rating': place.get('rating', ''),
+        'reviews': place.get('reviews'),
+        'category': place.get('category', ''),
+        'place_url': f'https://www.google.com/maps/place/?q=place_id:{place_id}' if place_id else '',
+        'place_id': place_id or '',
+        'latitude': place.get('latitude'),
+        'longitude': place.get('longitude'),
+        'location': location,
+        'work_type': work_type
+    }
+
+
+class PayloadHarvester:
+    """Collects places from the search payloads a Maps page loads, without touching the DOM.
+
+    attach() before navigating, harvest_initial_state() once the page has
+    loaded (the first results are embedded in it), then scroll the feed so
+    the page fetches more. With MAPS_PAYLOAD_RECORD_DIR set, every raw
+    payload is also written there so it can be replayed offline with
+    `python maps_payload.py <file>...`.
+    """
+
+    def __init__(self, page, on_places=None, record_dir=None):
+        self.page = page
+        self.on_places = on_places
+        self.record_dir = record_dir or os.environ.get('MAPS_PAYLOAD_RECORD_DIR')
+        self.places = []
+        self.payloads = 0
+        self.failures = 0
+        self._seen = set()
+        self._tasks = set()
+
+    def attach(self):
+        self.page.on('response', self._on_response)
+
+    def _on_response(self, response):
+        if any(marker in response.url for marker in PAYLOAD_URL_MARKERS):
+            task = asyncio.ensure_future(self._read(response))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _read(self, response):
+        try:
+            text = await response.text()
+        except Exception:
+            self.failures += 1
+            return
+        self._ingest(text)
+
+    async def harvest_initial_state(self):
+        try:
+            state = await self.page.evaluate(INITIAL_STATE_JS)
+        except Exception:
+            return
+        if state:
+            self._ingest(json.dumps(state))
+
+    def _ingest(self, text):
+        self.payloads += 1
+        self._record(text)
+        try:
+            places = parse_payload(text)
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ Could not parse Maps payload: {e}")
+            return
+        fresh = []
+        for place in places:
+            key = place['place_id'] or place['name']
+            if key and key not in self._seen:
+                self._seen.add(key)
+                fresh.append(place)
+        self.places.extend(fresh)
+        if fresh and self.on_places:
+            self.on_places(fresh)
+
+    def _record(self, text):
+        if not self.record_dir:
+            return
+        try:
+            os.makedirs(self.record_dir, exist_ok=True)
+            path = os.path.join(self.record_dir, f'maps_payload_{time.time():.6f}.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            print(f"⚠️ Could not record Maps payload: {e}")
+
+    async def drain(self):
+        """Wait for response bodies that are still being read"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self):
+        return {'payloads': self.payloads, 'places': len(self.places), 'failures': self.failures}
+
+
+if __name__ == '__main__':
+    # Replay recorded payloads: python maps_payload.py data/payloads/*.txt
+    for path in sys.argv[1:]:
+        with open(path, encoding='utf-8') as f:
+            places = parse_payload(f.read())
+        print(f"{path}: {len(places)} places")
+        for place in places:
+            print(f"   {place['name'][:40]:40} {place['rating']:>4} {place['phone']:>18}  {place['website'][:40]}")
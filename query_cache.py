@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(location, work_type, mode):
+    """Cache key for a search: trimmed, case-folded, whitespace-collapsed text plus the mode"""
+    location = ' '.join((location or '').split()).casefold()
+    work_type = ' '.join((work_type or '').split()).casefold()
+    # Same rewrite the Maps scraper applies before searching
+    if location == 'downtown':
+        location = 'downtown, usa'
+    return (location, work_type, mode)
+
+
+class QueryCache:
+    """In-memory LRU cache of scrape results per normalized query.
+
+    An entry is fresh for `ttl` seconds and then stale for another `stale_ttl`
+    seconds. Stale entries are still served while a background refresh
+    replaces them (stale-while-revalidate). An entry only answers requests for
+    at most as many results as the run that produced it.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, stale_ttl=None):
+        self.max_entries = max_entries or int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', 500))
+        self.ttl = ttl or int(os.environ.get('QUERY_CACHE_TTL_S', 3600))
+        self.stale_ttl = stale_ttl or int(os.environ.get('QUERY_CACHE_STALE_TTL_S', 6 * 3600))
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self, key, max_results=0):
+        """Return (entry, state) with state 'fresh' or 'stale', or (None, None) on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['max_results'] < max_results:
+                self.misses += 1
+                return None, None
+            age = now - entry['stored_at']
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if age <= self.ttl:
+                self.hits += 1
+                return entry, 'fresh'
+            self.stale_hits += 1
+            return entry, 'stale'
+
+    def set(self, key, value, max_results=0):
+        with self._lock:
+            self._entries[key] = {
+                'value': value,
+                'max_results': max_results,
+                'stored_at': time.time()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, max_results, producer, should_cache=bool):
+        """Serve from cache when possible, otherwise run `producer()` and cache its result.
+
+        Returns (entry, state) where state is 'fresh', 'stale' (a refresh was
+        started in the background) or 'miss' (the producer just ran). Results
+        failing `should_cache` (by default: empty ones, which usually mean the
+        scrape failed) are returned but not stored; their entry has `stored` False.
+        """
+        entry, state = self.get(key, max_results)
+        if entry is None:
+            value = producer()
+            stored = bool(should_cache(value))
+            if stored:
+                self.set(key, value, max_results)
+            return {'value': value, 'max_results': max_results, 'stored_at': time.time(), 'stored': stored}, 'miss'
+        if state == 'stale':
+            self.refresh_in_background(key, max_results, producer, should_cache)
+        return entry, state
+
+    def invalidate(self, key=None):
+        """Drop one query, or everything when key is None; returns the number of entries removed"""
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            return 1 if self._entries.pop(key, None) is not None else 0
+
+    def refresh_in_background(self, key, max_results, producer, should_cache=bool):
+        """Recompute a stale entry on a daemon thread; concurrent refreshes of one key collapse into one"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+
+        def run():
+            try:
+                value = producer()
+                if should_cache(value):
+                    self.set(key, value, max_results)
+            except Exception as e:
+                print(f"⚠️ Background refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    def remaining_ttl(self, entry):
+        """Seconds an entry stays fresh, for Cache-Control max-age"""
+        return max(0, int(self.ttl - (time.time() - entry['stored_at'])))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'stale_ttl_seconds': self.stale_ttl,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'background_refreshes': self.refreshes,
+                'refreshing': len(self._refreshing)
+            }
@@ -0,0 +1,164 @@
+import os
+import threading
+
+# Rough transfer size of one blocked request, used to estimate bandwidth saved
+TYPICAL_BYTES = {
+    'image': 40 * 1024,
+    'media': 250 * 1024,
+    'font': 35 * 1024,
+    'stylesheet': 20 * 1024,
+    'script': 60 * 1024,
+    'tile': 25 * 1024,
+    'tracker': 30 * 1024
+}
+
+# Analytics and ad endpoints none of the scrapers read
+TRACKER_PATTERNS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'facebook.net', 'connect.facebook', 'hotjar.com', 'segment.io',
+    'scorecardresearch.com', 'adservice.google', '/gen_204', '/log?format=json'
+]
+
+# Map tiles, Street View and place photos on Google Maps
+MAP_TILE_PATTERNS = [
+    '/maps/vt', '/vt?', 'khms', '/kh/v=', 'streetviewpixels', '/maps/preview/photo',
+    'googleusercontent.com/p/', 'googleusercontent.com/gps-cs'
+]
+
+DEFAULT_POLICIES = {
+    'maps': {
+        'resource_types': ['image', 'media', 'font'],
+        'url_patterns': MAP_TILE_PATTERNS + TRACKER_PATTERNS
+    },
+    'yellow_pages': {
+        'resource_types': ['image', 'media', 'font'],
+        'url_patterns': TRACKER_PATTERNS
+    },
+    'instagram': {
+        'resource_types': ['image', 'media', 'font'],
+        'url_patterns': TRACKER_PATTERNS
+    },
+    # Lead websites are only searched for emails in the markup
+    'website': {
+        'resource_types': ['image', 'media', 'font', 'stylesheet'],
+        'url_patterns': TRACKER_PATTERNS
+    }
+}
+
+
+def _env_list(name):
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class ResourcePolicy:
+    """Blocks resource types and URL patterns a scraper never reads.
+
+    Requests whose URL contains an `allowlist` entry always go through. Counts
+    blocked and allowed requests, and estimates the bytes saved from the
+    typical size of each blocked kind of resource.
+    """
+
+    def __init__(self, name, resource_types=(), url_patterns=(), allowlist=()):
+        self.name = name
+        self.resource_types = set(resource_types)
+        self.url_patterns = list(url_patterns)
+        self.allowlist = list(allowlist)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.blocked = {}
+
+    def classify(self, url, resource_type):
+        """The kind of resource to block ('image', 'tile', 'tracker', ...) or None to let it through"""
+        if any(pattern in url for pattern in self.allowlist):
+            return None
+        for pattern in self.url_patterns:
+            if pattern in url:
+                return 'tracker' if pattern in TRACKER_PATTERNS else 'tile'
+        if resource_type in self.resource_types:
+            return resource_type
+        return None
+
+    async def handle(self, route):
+        request = route.request
+        kind = self.classify(request.url, request.resource_type)
+        with self._lock:
+            if kind is None:
+                self.allowed += 1
+            else:
+                self.blocked[kind] = self.blocked.get(kind, 0) + 1
+        try:
+            if kind is None:
+                await route.continue_()
+            else:
+                await route.abort('blockedbyclient')
+        except Exception:
+            # The page or context was closed while the request was in flight
+            pass
+
+    async def apply(self, target):
+        """Install the policy on a BrowserContext or a Page (page routes take precedence)"""
+        if self.resource_types or self.url_patterns:
+            await target.route('**/*', self.handle)
+
+    def stats(self):
+        with self._lock:
+            blocked = dict(self.blocked)
+            allowed = self.allowed
+        total_blocked = sum(blocked.values())
+        requests = total_blocked + allowed
+        return {
+            'resource_types': sorted(self.resource_types),
+            'allowed_requests': allowed,
+            'blocked_requests': total_blocked,
+            'blocked_by_kind': blocked,
+            'blocked_share': round(total_blocked / requests, 3) if requests else 0,
+            'estimated_mb_saved': round(
+                sum(TYPICAL_BYTES.get(kind, 0) * count for kind, count in blocked.items()) / (1024 * 1024), 1
+            )
+        }
+
+
+class ResourcePolicies:
+    """The per-scraper policies, configured from the environment.
+
+    BLOCK_RESOURCES=0 turns blocking off everywhere. BLOCK_RESOURCES_<NAME>
+    (e.g. BLOCK_RESOURCES_MAPS=image,font) replaces a scraper's blocked
+    resource types, and BLOCK_ALLOWLIST lists URL substrings never blocked.
+    """
+
+    def __init__(self, enabled=None, allowlist=None):
+        if enabled is None:
+            enabled = os.environ.get('BLOCK_RESOURCES', '1').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled
+        allowlist = allowlist if allowlist is not None else (_env_list('BLOCK_ALLOWLIST') or [])
+        self._policies = {}
+        for name, defaults in DEFAULT_POLICIES.items():
+            types = _env_list(f'BLOCK_RESOURCES_{name.upper()}')
+            self._policies[name] = ResourcePolicy(
+                name,
+                defaults['resource_types'] if types is None else types,
+                defaults['url_patterns'],
+                allowlist
+            )
+
+    def get(self, name):
+        return self._policies.get(name)
+
+    async def apply(self, target, name):
+        """Install the named policy on a context or page; unknown names and disabled blocking are no-ops"""
+        policy = self._policies.get(name)
+        if self.enabled and policy is not None:
+            await policy.apply(target)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'policies': {name: policy.stats() for name, policy in self._policies.items()}
+        }
+
+
+# Shared by the browser pool and the email extractor
+policies = ResourcePolicies()
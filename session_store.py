@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DATA_DIR = os.environ.get('DATA_DIR', 'data')
+
+# Sessions in these states are still owned by a job and are never evicted
+ACTIVE_STATUSES = ('queued', 'processing')
+
+
+class SessionManager:
+    """Thread-safe registry of scraping sessions.
+
+    Lookups are O(1). Completed sessions are evicted once they are older than
+    `ttl` seconds, or least-recently-used first when more than `max_sessions`
+    are held or their leads exceed `memory_budget_mb`. Evicted sessions are
+    spilled to JSON files under `spill_dir` and transparently reloaded when
+    they are asked for again. Queued and running sessions are never evicted.
+
+    With a `store` (lead_store.LeadStore) every lead and status change is
+    also written to it; evicted sessions then spill without their leads and
+    reload them from the store's lead rows.
+    """
+
+    def __init__(self, max_sessions=None, ttl=None, memory_budget_mb=None, spill_dir=None, spill_ttl=None, store=None):
+        self.max_sessions = max_sessions or int(os.environ.get('SESSION_MAX_IN_MEMORY', 200))
+        self.ttl = ttl or int(os.environ.get('SESSION_TTL_S', 3600))
+        self.memory_budget = (memory_budget_mb or int(os.environ.get('SESSION_MEMORY_BUDGET_MB', 256))) * 1024 * 1024
+        self.spill_dir = spill_dir or os.environ.get('SESSION_SPILL_DIR', os.path.join(DATA_DIR, 'sessions'))
+        self.spill_ttl = spill_ttl or int(os.environ.get('SESSION_SPILL_TTL_S', 7 * 24 * 3600))
+        self.store = store
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        # Notified on every session change so streams can wait instead of polling
+        self._changed = threading.Condition(self._lock)
+        self._bytes = 0
+        self.evicted = 0
+        self.reloaded = 0
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+    def _spill_path(self, session_id):
+        # Session ids are uuid4 strings; keep anything else from escaping the directory
+        safe_id = ''.join(c for c in session_id if c.isalnum() or c == '-')
+        return os.path.join(self.spill_dir, f'{safe_id}.json')
+
+    @staticmethod
+    def _size_of(value):
+        return len(json.dumps(value, default=str))
+
+    def create(self, session_id, status='processing', **fields):
+        """Register a new queued or running session"""
+        session = {
+            'leads': [],
+            'status': status,
+            'total': 0,
+            'version': 0,
+            'created_at': time.time(),
+            '_bytes': 0
+        }
+        session.update(fields)
+        with self._lock:
+            self._sessions[session_id] = session
+            self._enforce_limits()
+        if self.store:
+            self.store.record_session(session_id, status=status, kind=fields.get('kind'), created_at=session['created_at'])
+        return session_id
+
+    def get(self, session_id):
+        """The session dict (treat as read-only), reloading it from disk if it was evicted; None if unknown"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+        # Disk and lead store reads happen outside the lock so they never hold up append_lead
+        loaded = self._load(session_id)
+        if loaded is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                # Another thread reloaded it meanwhile
+                return session
+            return self._install(session_id, loaded)
+
+    def snapshot(self, session_id, since=0):
+        """Status fields plus a copy of the leads appended after index `since`; None if unknown"""
+        if self.get(session_id) is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            leads = session.get('leads', [])
+            return {
+                'status': session.get('status', 'processing'),
+                'leads': leads[since:],
+                'cursor': len(leads),
+                'total': session.get('total', 0),
+                'version': session.get('version', 0),
+                'error': session.get('error'),
+                'created_at': session.get('created_at'),
+                'finished_at': session.get('finished_at')
+            }
+
+    def wait_for_change(self, session_id, version, timeout):
+        """Block until the session's version moves past `version`; False on timeout"""
+        deadline = time.time() + timeout
+        with self._changed:
+            while True:
+                session = self._sessions.get(session_id)
+                if session is None or session.get('version', 0) != version:
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def append_lead(self, session_id, lead):
+        """Add one lead to a session; returns the new lead count (0 if the session is gone)"""
+        size = self._size_of(lead)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return 0
+            session['leads'].append(lead)
+            session['total'] = len(session['leads'])
+            session['version'] = session.get('version', 0) + 1
+            session['_bytes'] += size
+            self._bytes += size
+            self._changed.notify_all()
+            if self.store:
+                self.store.record_lead(lead, session_id, session['total'] - 1)
+            return session['total']
+
+    def update(self, session_id, **fields):
+        """Set fields on a session; replacing `leads` re-accounts its memory"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            if 'leads' in fields:
+                new_bytes = self._size_of(fields['leads'])
+                self._bytes += new_bytes - session['_bytes']
+                session['_bytes'] = new_bytes
+                fields.setdefault('total', len(fields['leads']))
+            session.update(fields)
+            session['version'] = session.get('version', 0) + 1
+            self._changed.notify_all()
+            if session.get('status') not in ACTIVE_STATUSES:
+                session.setdefault('finished_at', time.time())
+                self._enforce_limits()
+            if self.store:
+                if 'leads' in fields:
+                    self.store.record_session_leads(session_id, fields['leads'])
+                if 'status' in fields or 'error' in fields:
+                    self.store.record_session(session_id, status=session.get('status'), error=session.get('error'),
+                                              finished_at=session.get('finished_at'))
+            return True
+
+    def finish(self, session_id, status='complete', **fields):
+        """Mark a session done; it becomes eligible for eviction"""
+        return self.update(session_id, status=status, finished_at=time.time(), **fields)
+
+    def _enforce_limits(self):
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if session.get('status') not in ACTIVE_STATUSES and now - session.get('finished_at', now) > self.ttl:
+                self._evict(session_id)
+        # OrderedDict is in LRU order - oldest first
+        for session_id, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and self._bytes <= self.memory_budget:
+                break
+            if session.get('status') not in ACTIVE_STATUSES:
+                self._evict(session_id)
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session['_bytes']
+        self.evicted += 1
+        record = {k: v for k, v in session.items() if k != '_bytes'}
+        if self.store:
+            # The store already holds the lead rows; the spill file only keeps the status fields
+            record.pop('leads', None)
+            record['leads_in_store'] = True
+        try:
+            path = self._spill_path(session_id)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(record, f, default=str)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"⚠️ Could not spill session {session_id} to disk: {e}")
+
+    def _load(self, session_id):
+        """An evicted session from its spill file or the lead store, or None (called without the lock)"""
+        path = self._spill_path(session_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.spill_ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            return self._load_from_store(session_id)
+        except (OSError, ValueError):
+            return None
+        if session.pop('leads_in_store', False) and self.store:
+            self._flush_pending(session_id)
+            session['leads'] = self.store.session_leads(session_id)
+        return session
+
+    def _install(self, session_id, session):
+        session['_bytes'] = self._size_of(session.get('leads', []))
+        # Reloaded sessions count as fresh again so they are not immediately re-evicted
+        session['finished_at'] = time.time()
+        self._sessions[session_id] = session
+        self._bytes += session['_bytes']
+        self.reloaded += 1
+        self._enforce_limits()
+        return self._sessions.get(session_id, session)
+
+    def _flush_pending(self, session_id):
+        # Only wait for the writer when this session still has writes queued
+        if self.store.is_pending(session_id):
+            self.store.flush()
+
+    def _load_from_store(self, session_id):
+        # Sessions from before a restart have no spill file but are still in the store
+        if not self.store:
+            return None
+        self._flush_pending(session_id)
+        session = self.store.session(session_id)
+        if session is None:
+            return None
+        if session.get('status') in ACTIVE_STATUSES:
+            # Its job died with the previous process
+            session['status'] = 'interrupted'
+        return session
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for s in self._sessions.values() if s.get('status') in ACTIVE_STATUSES)
+            return {
+                'in_memory': len(self._sessions),
+                'running': running,
+                'memory_mb': round(self._bytes / (1024 * 1024), 2),
+                'memory_budget_mb': round(self.memory_budget / (1024 * 1024), 2),
+                'evicted_to_disk': self.evicted,
+                'reloaded_from_disk': self.reloaded
+            }
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+
+from lead_dedupe import LeadDeduper
+
+# Sources /api/scrape runs side by side, in order of preference
+SCRAPE_SOURCES = [name.strip() for name in os.environ.get('SCRAPE_SOURCES', 'maps,yellow_pages').split(',') if name.strip()]
+
+# Seconds a source may run before it is stopped (its streamed leads are kept)
+DEFAULT_TIMEOUTS = {'maps': 300, 'yellow_pages': 60}
+# Share of max_results a source may fill while the others are still running
+DEFAULT_SHARES = {'maps': 1.0, 'yellow_pages': 0.5}
+
+
+def source_timeout(name):
+    return float(os.environ.get(f'SOURCE_TIMEOUT_S_{name.upper()}', DEFAULT_TIMEOUTS.get(name, 120)))
+
+
+def source_share(name):
+    return float(os.environ.get(f'SOURCE_SHARE_{name.upper()}', DEFAULT_SHARES.get(name, 1.0)))
+
+
+class SourceSink:
+    """Progress queue handed to one source; its leads go through the fan-out merge"""
+
+    def __init__(self, fanout, name):
+        self.fanout = fanout
+        self.name = name
+
+    def put(self, item, timeout=None):
+        update_type, data = item
+        if update_type == 'lead':
+            self.fanout.add(self.name, data)
+        elif self.fanout.progress_queue is not None:
+            self.fanout.progress_queue.put(item, timeout=timeout)
+
+
+class LeadFanOut:
+    """Runs several lead sources at once and merges their leads into one deduplicated stream.
+
+    Each source gets a time budget (`timeouts[name]`, else `timeout`, else
+    SOURCE_TIMEOUT_S_<NAME>) and may fill at
+    most its share (SOURCE_SHARE_<NAME>) of `max_results` while the others
+    run; leads past the share are held back and only used if the run ends
+    short. Duplicates within and across sources are dropped by a LeadDeduper.
+    Merged leads go to `progress_queue` as they arrive, and every source is
+    cancelled as soon as `max_results` leads are in.
+    """
+
+    def __init__(self, max_results, progress_queue=None, deduper=None, timeout=None, concurrency=None, timeouts=None):
+        self.max_results = max_results
+        self.progress_queue = progress_queue
+        self.leads = []
+        self.reserve = []
+        self.sources = {}
+        self.deduper = deduper or LeadDeduper()
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        # At most this many sources run at once; the rest wait for a slot (None = all at once)
+        self._slots = asyncio.Semaphore(concurrency) if concurrency else None
+        self._tasks = {}
+        self._offered = {}
+        self._stopped = False
+
+    def add(self, name, lead):
+        """Merge one lead from source `name`; False if it was a duplicate or is not needed (yet)"""
+        if self._stopped or id(lead) in self._offered:
+            return False
+        # Sources return the leads they already streamed - those are not duplicates
+        self._offered[id(lead)] = lead
+        if not self.deduper.add(lead):
+            return False
+        source = self.sources[name]
+        if source['accepted'] >= source['limit']:
+            self.reserve.append(lead)
+            return False
+        self._accept(name, lead)
+        if len(self.leads) >= self.max_results:
+            self.stop()
+        return True
+
+    def _accept(self, name, lead):
+        self.leads.append(lead)
+        self.sources[name]['accepted'] += 1
+        self._emit(lead)
+
+    def _emit(self, lead):
+        if self.progress_queue is not None:
+            try:
+                self.progress_queue.put(('lead', lead), timeout=5)
+            except Exception as queue_error:
+                print(f"⚠️ Queue error: {queue_error}")
+
+    def stop(self):
+        """Cancel every source still running"""
+        self._stopped = True
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+    async def _run_source(self, name, make_coro):
+        source = self.sources[name]
+        started = time.perf_counter()
+        acquired = False
+        try:
+            if self._slots is not None:
+                await self._slots.acquire()
+                acquired = True
+                # The time budget starts once the source has a slot
+                source['status'] = 'running'
+                started = time.perf_counter()
+            leads = await asyncio.wait_for(make_coro(SourceSink(self, name)), source['timeout'])
+            # Leads the source returned without streaming them
+            for lead in leads or []:
+                self.add(name, lead)
+            source['status'] = 'done'
+        except asyncio.TimeoutError:
+            source['status'] = 'timeout'
+            print(f"⏱️ Source {name} ran out of its {source['timeout']:.0f}s budget")
+        except asyncio.CancelledError:
+            if not self._stopped:
+                raise
+            source['status'] = 'stopped'
+        except Exception as e:
+            source['status'] = 'error'
+            print(f"⚠️ Source {name} failed: {e}")
+        finally:
+            if acquired:
+                self._slots.release()
+            source['seconds'] = round(time.perf_counter() - started, 1)
+
+    async def run(self, factories):
+        """Run `factories` ({name: make_coro(progress_queue)}) concurrently; returns the merged leads"""
+        for name in factories:
+            self.sources[name] = {
+                'limit': max(1, round(self.max_results * source_share(name))),
+                'timeout': self.timeouts.get(name) or self.timeout or source_timeout(name),
+                'accepted': 0,
+                'status': 'waiting' if self._slots is not None else 'running',
+                'seconds': None
+            }
+        self._tasks = {
+            name: asyncio.create_task(self._run_source(name, make_coro))
+            for name, make_coro in factories.items()
+        }
+        try:
+            await asyncio.gather(*self._tasks.values())
+        finally:
+            self.stop()
+        # Every source is finished: held-back leads fill what is left
+        for lead in self.reserve[:max(0, self.max_results - len(self.leads))]:
+            self.leads.append(lead)
+            self._emit(lead)
+        print(f"🔀 Fan-out: {len(self.leads)} leads, {self.deduper.duplicates} duplicates dropped - {self.sources}")
+        return self.leads
+
+    def stats(self):
+        return {
+            'leads': len(self.leads),
+            'duplicates': self.deduper.duplicates,
+            'reserve': len(self.reserve),
+            'sources': {name: dict(source) for name, source in self.sources.items()}
+        }
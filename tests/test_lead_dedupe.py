@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lead_dedupe import LeadDeduper
+
+
+def test_same_phone_is_the_same_business():
+    deduper = LeadDeduper()
+    assert deduper.add({'name': "Joe's Plumbing", 'phone': '(512) 555-0134', 'address': '1100 Congress Ave'})
+    assert not deduper.add({'name': "Joe's Plumbing & Heating", 'phone': '+1 512-555-0134',
+                            'address': '1100 Congress Avenue, Suite 2'})
+
+
+def test_chain_branches_sharing_a_phone_stay_separate():
+    deduper = LeadDeduper()
+    assert deduper.add({'name': 'Roto-Rooter Plumbing', 'phone': '1-800-768-6911', 'address': '100 Main St'})
+    assert deduper.add({'name': 'Roto-Rooter Plumbing', 'phone': '(800) 768-6911', 'address': '900 Oak Ave'})
+
+
+def test_phone_matches_across_place_id_kinds():
+    # DOM leads carry a feature id, payload leads a ChIJ place id
+    deduper = LeadDeduper()
+    assert deduper.add({'name': "Joe's Plumbing", 'phone': '(512) 555-0134',
+                        'place_url': 'https://www.google.com/maps/place/Joe/data=!4m2!3m1!1s0x8644b5a:0x1234abc'})
+    assert not deduper.add({'name': "Joe's Plumbing", 'phone': '+1 512-555-0134',
+                            'place_id': 'ChIJN1t_tDeuEmsRUsoyG83frY4'})
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lead_store import LeadStore
+
+
+def stored_names(store):
+    store.flush()
+    return sorted(row[0] for row in store._reader.execute('SELECT name FROM leads'))
+
+
+def test_shared_phone_merges_only_when_place_ids_and_addresses_agree(tmp_path):
+    store = LeadStore(str(tmp_path / 'leads.sqlite3'))
+    store.record_lead({'name': 'Acme Plumbing', 'phone': '(800) 768-6911', 'place_id': 'ChIJaaa', 'address': '100 Main St'})
+    # Different place id of the same kind: a different business
+    store.record_lead({'name': 'Best Drains', 'phone': '(800) 768-6911', 'place_id': 'ChIJbbb', 'address': '100 Main St'})
+    # Different street address: another branch
+    store.record_lead({'name': 'Acme Plumbing', 'phone': '(800) 768-6911', 'address': '900 Oak Ave'})
+    # Same phone and address, no place id: the first lead again
+    store.record_lead({'name': 'Acme Plumbing', 'phone': '+1 800 768 6911', 'address': '100 Main Street'})
+    assert stored_names(store) == ['Acme Plumbing', 'Acme Plumbing', 'Best Drains']
@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from maps_payload import decode_payload, parse_payload, place_to_lead
+
+# A search response body as the page receives it: {"d": ")]}'..."} wrapper, XSSI prefix and /*""*/ tail
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'maps_search_payload.txt')
+
+
+def load_fixture():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_decode_unwraps_the_response_body():
+    assert decode_payload(load_fixture())[0][0] == 'plumber austin'
+    assert decode_payload(")]}'\n[1, 2]") == [1, 2]
+    assert decode_payload('<html>') is None
+
+
+def test_parse_payload_reads_every_place_and_skips_other_lists():
+    places = parse_payload(load_fixture())
+    assert [place['name'] for place in places] == ["Joe's Plumbing & Heating", 'Austin Rooter Co']
+
+
+def test_parse_place_fields():
+    joes, rooter = parse_payload(load_fixture())
+
+    assert joes['place_id'] == 'ChIJN1t_tDeuEmsRUsoyG83frY4'
+    assert (joes['latitude'], joes['longitude']) == (30.2746652, -97.7403505)
+    assert joes['phone'] == '(512) 555-0134'
+    # /url?q= redirect unwrapped
+    assert joes['website'] == 'https://joesplumbing.com/'
+    assert joes['address'] == '1100 Congress Ave, Austin, TX 78701'
+    assert (joes['rating'], joes['reviews'], joes['category']) == ('4.7', 312, 'Plumber')
+
+    # Address from the split address parts, phone from the alternative slot, no website
+    assert rooter['address'] == '600 W 28th St, Austin, TX 78705'
+    assert rooter['phone'] == '+1 512-555-0199'
+    assert rooter['website'] == ''
+    assert (rooter['latitude'], rooter['longitude']) == (30.2922, -97.7451)
+
+
+def test_place_to_lead_keeps_place_reference():
+    lead = place_to_lead(parse_payload(load_fixture())[0], 'Austin', 'plumber')
+    assert lead['place_url'] == 'https://www.google.com/maps/place/?q=place_id:ChIJN1t_tDeuEmsRUsoyG83frY4'
+    assert (lead['place_id'], lead['latitude'], lead['longitude']) == ('ChIJN1t_tDeuEmsRUsoyG83frY4', 30.2746652, -97.7403505)
+    assert (lead['location'], lead['work_type']) == ('Austin', 'plumber')
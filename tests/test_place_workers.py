@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+pytest.importorskip('flask')
+pytest.importorskip('playwright')
+pytest.importorskip('aiohttp')
+
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+
+from app_railway import PLACE_DETAILS_JS, LeadScraper
+
+PLACES = {
+    'https://www.google.com/maps/place/Joes+Plumbing/@30.27,-97.74,17z': {
+        'name': "Joe's Plumbing", 'address': '1100 Congress Ave', 'phone': '(512) 555-0134'
+    },
+    'https://www.google.com/maps/place/Austin+Rooter/@30.29,-97.74,17z': {
+        'name': 'Austin Rooter Co', 'address': '600 W 28th St', 'phone': '(512) 555-0199'
+    }
+}
+
+
+class FakePage:
+    """Only the Page methods the worker uses, with Playwright's signatures"""
+
+    def __init__(self):
+        self.url = 'about:blank'
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.url = url
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        return True
+
+    async def evaluate(self, expression, arg=None):
+        assert expression == PLACE_DETAILS_JS
+        return dict(PLACES[self.url])
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+
+def test_concurrent_workers_return_every_place():
+    scraper = LeadScraper(None, email_extractor=object(), email_cache=object())
+    leads = asyncio.run(scraper.extract_places_concurrently(
+        FakeContext(), list(PLACES), 'Austin', 'plumber', max_results=10, concurrency=2
+    ))
+    assert sorted(lead['name'] for lead in leads) == ['Austin Rooter Co', "Joe's Plumbing"]
+    assert all(lead['location'] == 'Austin' and lead['work_type'] == 'plumber' for lead in leads)
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import threading
+import time
+
+# Hard ceiling for any single wait, whatever the caller asks for
+MAX_WAIT_MS = int(os.environ.get('WAIT_MAX_MS', 10000))
+
+TITLE_JS = """
+    () => {
+        const el = document.querySelector('h1.DUwDvf') || document.querySelector('h1');
+        return el && el.textContent ? el.textContent.trim() : '';
+    }
+"""
+
+TITLE_CHANGED_JS = """
+    (previous) => {
+        const el = document.querySelector('h1.DUwDvf') || document.querySelector('h1');
+        const title = el && el.textContent ? el.textContent.trim() : '';
+        return title !== '' && title !== previous;
+    }
+"""
+
+PLACE_LINK_COUNT_JS = "() => document.querySelectorAll('a[href*=\"/maps/place/\"]').length"
+
+FEED_GREW_JS = """
+    (previous) => document.querySelectorAll('a[href*="/maps/place/"]').length > previous
+"""
+
+RESULTS_LOADED_JS = """
+    () => !!(document.querySelector('div[role="feed"]') ||
+             document.querySelector('a[href*="/maps/place/"]') ||
+             document.querySelector('h1.DUwDvf'))
+"""
+
+PANEL_CLOSED_JS = "() => !document.querySelector('h1.DUwDvf')"
+
+COUNT_GREW_JS = """
+    ([selector, previous]) => document.querySelectorAll(selector).length > previous
+"""
+
+
+class WaitEngine:
+    """Waits for a real page condition and returns as soon as it holds.
+
+    Every wait is capped at MAX_WAIT_MS. When the condition does not show up in
+    time the wait falls back to a short fixed sleep (`fallback_ms`) so callers
+    keep the old "give it a moment" behaviour. Durations are recorded per
+    condition so the time actually spent waiting can be inspected.
+    """
+
+    def __init__(self, max_wait_ms=MAX_WAIT_MS):
+        self.max_wait_ms = max_wait_ms
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, elapsed_ms, met):
+        with self._lock:
+            entry = self._stats.setdefault(name, {
+                'count': 0, 'met': 0, 'fallbacks': 0, 'total_ms': 0.0, 'max_ms': 0.0
+            })
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            if met:
+                entry['met'] += 1
+            else:
+                entry['fallbacks'] += 1
+
+    async def _wait(self, name, waiter, timeout, fallback_ms):
+        timeout = min(timeout, self.max_wait_ms)
+        start = time.perf_counter()
+        met = True
+        try:
+            await waiter(timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Timed out (or the page navigated away) - fall back to a short fixed pause
+            met = False
+            if fallback_ms:
+                await asyncio.sleep(fallback_ms / 1000)
+        self._record(name, (time.perf_counter() - start) * 1000, met)
+        return met
+
+    async def until(self, page, name, predicate_js, arg=None, timeout=5000, fallback_ms=0):
+        """Wait until a JS predicate is truthy on the page"""
+        return await self._wait(
+            name,
+            lambda t: page.wait_for_function(predicate_js, arg=arg, timeout=t),
+            timeout, fallback_ms
+        )
+
+    async def selector(self, page, selector, timeout=5000, fallback_ms=0, state='visible'):
+        """Wait until a selector matches"""
+        return await self._wait(
+            f'selector:{selector[:40]}',
+            lambda t: page.wait_for_selector(selector, timeout=t, state=state),
+            timeout, fallback_ms
+        )
+
+    async def network_quiet(self, page, timeout=3000, fallback_ms=0):
+        """Wait until the page has had no network traffic for 500 ms"""
+        return await self._wait(
+            'network_quiet',
+            lambda t: page.wait_for_load_state('networkidle', timeout=t),
+            timeout, fallback_ms
+        )
+
+    async def results_loaded(self, page, timeout=10000, fallback_ms=1000):
+        """Maps search page shows its results feed (or a single place)"""
+        return await self.until(page, 'results_loaded', RESULTS_LOADED_JS, timeout=timeout, fallback_ms=fallback_ms)
+
+    async def title_changed(self, page, previous_title, timeout=5000, fallback_ms=500):
+        """Detail panel h1 shows a business other than `previous_title`"""
+        return await self.until(page, 'title_changed', TITLE_CHANGED_JS, arg=previous_title or '',
+                                timeout=timeout, fallback_ms=fallback_ms)
+
+    async def feed_grew(self, page, previous_count, timeout=3000, fallback_ms=0):
+        """More place cards than `previous_count` are in the results feed"""
+        return await self.until(page, 'feed_grew', FEED_GREW_JS, arg=previous_count,
+                                timeout=timeout, fallback_ms=fallback_ms)
+
+    async def count_grew(self, page, selector, previous_count, timeout=3000, fallback_ms=0):
+        """More elements than `previous_count` match `selector`"""
+        return await self.until(page, 'count_grew', COUNT_GREW_JS, arg=[selector, previous_count],
+                                timeout=timeout, fallback_ms=fallback_ms)
+
+    async def panel_closed(self, page, timeout=2000, fallback_ms=200):
+        """The place detail panel has gone away after Escape"""
+        return await self.until(page, 'panel_closed', PANEL_CLOSED_JS, timeout=timeout, fallback_ms=fallback_ms)
+
+    async def current_title(self, page):
+        try:
+            return await page.evaluate(TITLE_JS)
+        except Exception:
+            return ''
+
+    async def place_link_count(self, page):
+        try:
+            return await page.evaluate(PLACE_LINK_COUNT_JS)
+        except Exception:
+            return 0
+
+    async def count(self, page, selector):
+        try:
+            return len(await page.query_selector_all(selector))
+        except Exception:
+            return 0
+
+    def stats(self):
+        """Per-condition wait timings"""
+        with self._lock:
+            return {
+                name: {
+                    'count': entry['count'],
+                    'met': entry['met'],
+                    'fallbacks': entry['fallbacks'],
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 1),
+                    'max_ms': round(entry['max_ms'], 1),
+                    'total_ms': round(entry['total_ms'], 1)
+                }
+                for name, entry in self._stats.items()
+            }
+
+
+waits = WaitEngine()